@@ -12,14 +12,24 @@ Usage:
     curl -H "X-Admin-Token: <token>" http://localhost:5000/api/users
 """
 
+import base64
 import hashlib
 import hmac
 import os
 import secrets
 import time
 import warnings
+from functools import lru_cache, wraps
 from typing import Optional, Tuple
 
+# Flask is only needed for the route decorator; token generation from the
+# CLI works without it.
+try:
+    from flask import jsonify, request
+except ImportError:
+    jsonify = None
+    request = None
+
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -39,6 +49,31 @@ if not ADMIN_SECRET:
 # Token validity period (default: 24 hours)
 TOKEN_EXPIRY_SECONDS = int(os.getenv("ADMIN_TOKEN_EXPIRY", str(24 * 60 * 60)))
 
+# Pre-encode the secret once; the secret never changes after import.
+_ADMIN_SECRET_BYTES = ADMIN_SECRET.encode("utf-8")
+
+# HMAC template with the key schedule (ipad/opad XOR + initial compression)
+# already absorbed. Each call clones the initialized state and only hashes
+# the short payload, instead of rebuilding the key schedule from scratch.
+_BASE_HMAC = hmac.new(_ADMIN_SECRET_BYTES, digestmod=hashlib.sha256)
+
+
+# Token layout: urlsafe base64 of (8-byte big-endian expiry || 32-byte
+# HMAC digest). The same raw expiry bytes serve as both the HMAC input
+# and the expiry comparison, so verification needs no int->str->bytes
+# round-trips — one base64 decode, one slice, one HMAC.
+_EXPIRY_BYTES = 8
+_RAW_TOKEN_LEN = _EXPIRY_BYTES + hashlib.sha256().digest_size
+_TOKEN_LEN = (_RAW_TOKEN_LEN * 8 + 5) // 6  # unpadded urlsafe base64 length
+_B64_PAD = "=="
+
+
+def _sign(payload: bytes) -> bytes:
+    """Compute the raw HMAC-SHA256 digest for a token payload."""
+    h = _BASE_HMAC.copy()
+    h.update(payload)
+    return h.digest()
+
 
 # ---------------------------------------------------------------------------
 # Token Generation & Verification
@@ -48,7 +83,7 @@ def generate_admin_token(expires_in: Optional[int] = None) -> str:
     """
     Generate a time-limited admin token.
 
-    The token format is: <expiry_timestamp>.<hmac_signature>
+    The token is urlsafe base64 of <expiry_bytes><hmac_signature>.
     This avoids the need for a database or external JWT library.
 
     Args:
@@ -58,12 +93,9 @@ def generate_admin_token(expires_in: Optional[int] = None) -> str:
         A signed token string.
     """
     ttl = expires_in or TOKEN_EXPIRY_SECONDS
-    expiry = int(time.time()) + ttl
-    payload = str(expiry).encode("utf-8")
-    signature = hmac.new(
-        ADMIN_SECRET.encode("utf-8"), payload, hashlib.sha256
-    ).hexdigest()
-    return f"{expiry}.{signature}"
+    exp_bytes = (int(time.time()) + ttl).to_bytes(_EXPIRY_BYTES, "big")
+    raw = exp_bytes + _sign(exp_bytes)
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
 
 
 def verify_admin_token(token: str) -> Tuple[bool, str]:
@@ -80,32 +112,55 @@ def verify_admin_token(token: str) -> Tuple[bool, str]:
     if not token:
         return False, "No token provided"
 
-    parts = token.split(".")
-    if len(parts) != 2:
+    if len(token) != _TOKEN_LEN:
         return False, "Invalid token format"
 
     try:
-        expiry = int(parts[0])
+        raw = base64.urlsafe_b64decode(token + _B64_PAD)
     except ValueError:
         return False, "Invalid token format"
 
     # Check expiry
-    if time.time() > expiry:
+    if time.time() > int.from_bytes(raw[:_EXPIRY_BYTES], "big"):
         return False, "Token expired"
 
-    # Verify HMAC signature
-    expected_sig = hmac.new(
-        ADMIN_SECRET.encode("utf-8"),
-        str(expiry).encode("utf-8"),
-        hashlib.sha256,
-    ).hexdigest()
-
-    if not hmac.compare_digest(parts[1], expected_sig):
+    # Verify HMAC signature. Signature validity for a given token never
+    # changes, so it is safe to memoize — expiry is always checked fresh
+    # above, so a cached hit can never outlive the token.
+    if not _signature_ok(raw):
         return False, "Invalid token signature"
 
     return True, ""
 
 
+def _verify_fast(token: str) -> bool:
+    """Boolean-only token check for the request hot path.
+
+    Skips building the (is_valid, error) tuple and error strings that
+    verify_admin_token allocates; the decorator only falls back to the
+    full version to produce a 401 detail message.
+    """
+    if len(token) != _TOKEN_LEN:
+        return False
+    try:
+        raw = base64.urlsafe_b64decode(token + _B64_PAD)
+    except ValueError:
+        return False
+    if time.time() > int.from_bytes(raw[:_EXPIRY_BYTES], "big"):
+        return False
+    return _signature_ok(raw)
+
+
+@lru_cache(maxsize=256)
+def _signature_ok(raw: bytes) -> bool:
+    """Constant-time signature check, memoized for repeat requests.
+
+    Admin scripts tend to poll with the same token; this turns the
+    per-request HMAC into a dict lookup after the first verification.
+    """
+    return hmac.compare_digest(raw[_EXPIRY_BYTES:], _sign(raw[:_EXPIRY_BYTES]))
+
+
 # ---------------------------------------------------------------------------
 # Flask Decorator
 # ---------------------------------------------------------------------------
@@ -120,16 +175,14 @@ def require_admin(f):
         def admin_endpoint():
             return jsonify({"status": "ok"})
     """
-    from functools import wraps
-    from flask import request, jsonify
-
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get("X-Admin-Token", "")
-        is_valid, error = verify_admin_token(token)
-        if not is_valid:
-            return jsonify({"error": "Unauthorized", "detail": error}), 401
-        return f(*args, **kwargs)
+        # Happy path: no tuple, no error string, straight to the view
+        if token and _verify_fast(token):
+            return f(*args, **kwargs)
+        _, error = verify_admin_token(token)
+        return jsonify({"error": "Unauthorized", "detail": error}), 401
 
     return decorated
 
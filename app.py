@@ -7,34 +7,67 @@ Flask web server with:
   - Admin API with HMAC-based token authentication
 """
 
+import base64
+import hmac
 import logging
 import os
+import queue
+import ssl
 import sys
-from datetime import datetime, timezone
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from xml.sax.saxutils import escape as xml_escape
 
-from flask import Flask, request, jsonify, abort
+from flask import Flask, Response, request, jsonify, abort
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from config import Config
-from sender import ReminderScheduler
+from config import Config, LOG_FILE
+from sender import ReminderScheduler, MIN_RUN_INTERVAL_SECONDS
 from models import UserStore
 from admin_auth import require_admin
 
+# orjson serializes dict lists several times faster than stdlib json and
+# emits bytes directly. Fall back to Flask's jsonify if unavailable.
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+# TwiML replies are constant except for the message body; build them from a
+# fixed byte template + one XML escape instead of a MessagingResponse DOM.
+_TWIML_PREFIX = b'<?xml version="1.0" encoding="UTF-8"?><Response><Message>'
+_TWIML_SUFFIX = b"</Message></Response>"
+
 # ---------------------------------------------------------------------------
 # Logging setup
 # ---------------------------------------------------------------------------
 
 os.makedirs(Config.LOG_DIR, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(os.path.join(Config.LOG_DIR, "zhanghealth.log")),
-    ],
-)
+# Log records are handed off to a background listener thread through a
+# queue, so request threads never block on formatting or file I/O. The
+# listener feeds both sinks; the file side rotates instead of growing
+# unboundedly.
+_log_queue = queue.SimpleQueue()
+_log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(_log_formatter)
+_file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10_000_000, backupCount=5)
+_file_handler.setFormatter(_log_formatter)
+
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+
+_log_listener = QueueListener(_log_queue, _stream_handler, _file_handler)
+_log_listener.start()
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -44,6 +77,12 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = Config.FLASK_SECRET_KEY
 
+# Twilio fires webhooks at interactive latency; reuse one prebuilt empty
+# response for the no-reply branch instead of constructing a Response
+# (plus default headers) per hit. It is never mutated after send.
+_EMPTY_204 = Response(status=204)
+_EMPTY_204.headers["Content-Length"] = "0"
+
 # Determine if we're in dry-run mode (no Twilio credentials)
 DRY_RUN = not (Config.TWILIO_ACCOUNT_SID and Config.TWILIO_AUTH_TOKEN)
 if DRY_RUN:
@@ -52,27 +91,85 @@ if DRY_RUN:
         "Messages will be logged but not sent."
     )
 
-reminder_scheduler = ReminderScheduler(dry_run=DRY_RUN)
+# Signature verification leans on OpenSSL's hardware-accelerated SHA-1;
+# old OpenSSL builds fall back to a much slower software path.
+if not DRY_RUN and ssl.OPENSSL_VERSION_INFO < (1, 1, 1):
+    logger.warning(
+        f"OpenSSL {ssl.OPENSSL_VERSION} predates 1.1.1; "
+        "Twilio signature checks will not use hardware SHA acceleration."
+    )
+
+_TWILIO_AUTH_TOKEN_BYTES = Config.TWILIO_AUTH_TOKEN.encode("utf-8")
+
+
+def _validate_twilio_signature(url: str, params, signature: str) -> bool:
+    """Validate an X-Twilio-Signature header.
+
+    Same scheme as twilio's RequestValidator (HMAC-SHA1 over the URL plus
+    sorted form parameters), but computed through the one-shot hmac.digest()
+    C path instead of constructing a validator object per request.
+    """
+    data = url + "".join(k + v for k, v in sorted(params.items()))
+    expected = base64.b64encode(
+        hmac.digest(_TWILIO_AUTH_TOKEN_BYTES, data.encode("utf-8"), "sha1")
+    ).decode("ascii")
+    return hmac.compare_digest(expected, signature)
+
+# Lazy singleton factories. Constructing these at import time would make
+# every gunicorn worker pay for Config loads and data-file opens during
+# startup; each worker now builds them once, on first use. The shared
+# UserStore also keeps its parsed-users cache across requests.
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> ReminderScheduler:
+    """The process-wide ReminderScheduler, built on first use."""
+    return ReminderScheduler(dry_run=DRY_RUN)
+
+
+@lru_cache(maxsize=1)
+def get_store() -> UserStore:
+    """The process-wide UserStore, built on first use."""
+    return UserStore()
 
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
 
 
+def ojsonify(obj):
+    """Build a JSON response via orjson when available."""
+    if HAS_ORJSON:
+        return app.response_class(orjson.dumps(obj), mimetype="application/json")
+    return jsonify(obj)
+
+
+# Liveness probes hit "/" every few seconds; cache the formatted server
+# time at second granularity instead of rebuilding a datetime + ISO string
+# per request. A racing thread at worst writes the same second's string.
+_TS_CACHE = [0, ""]
+
+
+def _utc_iso() -> str:
+    """Current UTC time in ISO format, cached per second."""
+    now = int(time.time())
+    if _TS_CACHE[0] != now:
+        _TS_CACHE[0] = now
+        _TS_CACHE[1] = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    return _TS_CACHE[1]
+
+
 @app.route("/", methods=["GET"])
 def index():
     """Health check and status page."""
-    store = UserStore()
-    users = store.load_users()
-    active_count = sum(1 for u in users if u.active)
-    return jsonify(
+    return ojsonify(
         {
             "service": "Zhang Health Reminder System",
             "status": "running",
             "mode": "dry_run" if DRY_RUN else "live",
-            "total_users": len(users),
-            "active_users": active_count,
-            "server_time_utc": datetime.now(timezone.utc).isoformat(),
+            "total_users": get_store().user_count,
+            "active_users": get_store().active_count,
+            "server_time_utc": _utc_iso(),
         }
     )
 
@@ -86,35 +183,27 @@ def twilio_webhook():
     """
     # Validate Twilio request signature (if auth token available)
     if not DRY_RUN:
-        try:
-            from twilio.request_validator import RequestValidator
-            validator = RequestValidator(Config.TWILIO_AUTH_TOKEN)
-            url = request.url
-            signature = request.headers.get("X-Twilio-Signature", "")
-            if not validator.validate(url, request.form, signature):
-                logger.warning(f"Invalid Twilio signature from {request.remote_addr}")
-                abort(403)
-        except ImportError:
-            pass  # Twilio not installed, skip validation
+        signature = request.headers.get("X-Twilio-Signature", "")
+        if not _validate_twilio_signature(request.url, request.form, signature):
+            logger.warning("Invalid Twilio signature from %s", request.remote_addr)
+            abort(403)
 
     from_number = request.values.get("From", "")
     body = request.values.get("Body", "")
 
-    logger.info(f"Received SMS from {from_number}: {body}")
+    # %-style args defer interpolation until the record is actually emitted
+    logger.info("Received SMS from %s: %s", from_number, body)
 
     # Process the reply and get a response
-    response_text = reminder_scheduler.handle_reply(from_number, body)
+    response_text = get_scheduler().handle_reply(from_number, body)
 
     if response_text:
-        # Send the response back via Twilio TwiML
-        from twilio.twiml.messaging_response import MessagingResponse
-
-        resp = MessagingResponse()
-        resp.message(response_text)
-        return str(resp), 200, {"Content-Type": "text/xml"}
+        # Send the response back via Twilio TwiML (bytes all the way through)
+        body = xml_escape(response_text).encode("utf-8")
+        return _TWIML_PREFIX + body + _TWIML_SUFFIX, 200, {"Content-Type": "text/xml"}
 
     # No response needed
-    return "", 204
+    return _EMPTY_204
 
 
 @app.route("/api/send-now", methods=["POST"])
@@ -125,31 +214,28 @@ def send_now():
     Requires a valid HMAC-signed admin token in the X-Admin-Token header.
     Generate a token with: python admin_auth.py generate
     """
-    reminder_scheduler.check_and_send_reminders()
-    return jsonify({"status": "ok", "message": "Reminder check triggered."})
+    get_scheduler().check_and_send_reminders()
+    return ojsonify({"status": "ok", "message": "Reminder check triggered."})
 
 
 @app.route("/api/users", methods=["GET"])
 @require_admin
 def list_users():
     """List all users (admin endpoint). Requires valid admin token."""
-    store = UserStore()
-    users = store.load_users()
-    return jsonify({"users": [u.to_dict() for u in users]})
+    return ojsonify({"users": get_store().to_dicts()})
 
 
 @app.route("/api/users/<phone>/toggle", methods=["POST"])
 @require_admin
 def toggle_user(phone):
     """Toggle a user's active status (admin endpoint). Requires valid admin token."""
-    store = UserStore()
-    user = store.get_user_by_phone(phone)
+    user = get_store().get_user_by_phone(phone)
     if not user:
-        return jsonify({"error": "User not found"}), 404
+        return ojsonify({"error": "User not found"}), 404
 
     new_status = not user.active
-    store.update_user(phone, active=new_status)
-    return jsonify({"phone": phone, "active": new_status})
+    get_store().update_user(phone, active=new_status)
+    return ojsonify({"phone": phone, "active": new_status})
 
 
 # ---------------------------------------------------------------------------
@@ -157,18 +243,54 @@ def toggle_user(phone):
 # ---------------------------------------------------------------------------
 
 
+_bg_scheduler = None
+
+
 def start_scheduler():
-    """Start the background scheduler for periodic reminder checks."""
+    """Start the background scheduler for periodic reminder checks.
+
+    Idempotent: called from the gunicorn post_fork hook (see
+    gunicorn.conf.py) or the dev-server entry point, once per process.
+    """
+    global _bg_scheduler
+    if _bg_scheduler is not None:
+        return _bg_scheduler
     scheduler = BackgroundScheduler()
-    # Check every hour if any reminders need to be sent
+    reminder = get_scheduler()
+
+    def _reminder_tick():
+        ran = reminder.check_and_send_reminders()
+        if ran:
+            # Adaptive wake: pull the next run forward to the next due slot
+            # when it lands inside the hour. The floor keeps adaptive wakes
+            # from being coalesced as redundant; the hourly interval is the
+            # ceiling, so a miscomputed slot never delays a send.
+            delay = max(
+                float(MIN_RUN_INTERVAL_SECONDS),
+                min(3600.0, reminder.seconds_until_next_due()),
+            )
+        else:
+            # The run was coalesced away (e.g. a manual /api/send-now just
+            # ran). Retry once the guard window expires instead of sleeping
+            # to the next due slot, which would skip today's preferred hour.
+            delay = float(MIN_RUN_INTERVAL_SECONDS)
+        scheduler.modify_job(
+            "reminder_check",
+            next_run_time=datetime.now(timezone.utc) + timedelta(seconds=delay),
+        )
+
+    # Check at least every hour if any reminders need to be sent
     scheduler.add_job(
-        reminder_scheduler.check_and_send_reminders,
+        _reminder_tick,
         trigger=IntervalTrigger(hours=1),
         id="reminder_check",
         name="Check and send exercise reminders",
         replace_existing=True,
+        coalesce=True,  # collapse missed-fire backlog into one run
+        max_instances=1,
     )
     scheduler.start()
+    _bg_scheduler = scheduler
     logger.info("Background scheduler started. Checking for reminders every hour.")
     return scheduler
 
@@ -179,7 +301,8 @@ def start_scheduler():
 
 if __name__ == "__main__":
     logger.info("=" * 60)
-    logger.info("  Zhang Health Reminder System Starting")
+    logger.info("  Zhang Health Reminder System Starting (dev server)")
+    logger.info("  For production use: gunicorn -c gunicorn.conf.py app:app")
     logger.info("=" * 60)
 
     # Start the background scheduler
@@ -19,7 +19,7 @@ import sys
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import Config
+from config import Config, SAMPLE_USERS_FILE
 from models import User, UserStore
 from messages import get_exercise_message, EXERCISE_PLANS
 from sender import ReminderScheduler
@@ -114,7 +114,7 @@ def cmd_add_user(args):
 
 def cmd_init_sample(args):
     """Initialize sample users.json from the example template."""
-    example_path = os.path.join(Config.DATA_DIR, "users.json.example")
+    example_path = SAMPLE_USERS_FILE
     target_path = Config.USERS_FILE
 
     if os.path.exists(target_path):
@@ -5,6 +5,7 @@ Loads settings from environment variables (.env file).
 
 import os
 import secrets as _secrets
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -57,3 +58,15 @@ class Config:
                 f"Missing required environment variables: {', '.join(missing)}. "
                 f"Please copy .env.example to .env and fill in your credentials."
             )
+
+
+# ---------------------------------------------------------------------------
+# Pre-resolved path constants
+# ---------------------------------------------------------------------------
+# Importing these directly skips the Config attribute-lookup chain and the
+# repeated os.path.join calls at use sites. Interned so comparisons and dict
+# lookups on the paths are pointer checks.
+
+USERS_FILE = sys.intern(Config.USERS_FILE)
+LOG_FILE = sys.intern(os.path.join(Config.LOG_DIR, "zhanghealth.log"))
+SAMPLE_USERS_FILE = sys.intern(os.path.join(Config.DATA_DIR, "users.json.example"))
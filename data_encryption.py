@@ -36,72 +36,162 @@ except ImportError:
 _ENCRYPTION_KEY_ENV = "DATA_ENCRYPTION_KEY"
 _raw_key = os.getenv(_ENCRYPTION_KEY_ENV, "")
 
-if HAS_CRYPTO and _raw_key:
-    # Derive a valid Fernet key from the user-provided secret
-    # (Fernet requires a 32-byte URL-safe base64-encoded key)
-    _derived = hashlib.sha256(_raw_key.encode("utf-8")).digest()
-    _fernet_key = base64.urlsafe_b64encode(_derived)
-    _fernet = Fernet(_fernet_key)
-    ENCRYPTION_ENABLED = True
-elif HAS_CRYPTO and not _raw_key:
-    _fernet = None
-    ENCRYPTION_ENABLED = False
+_ENC_PREFIX = b"enc:"
+
+
+class Encryptor:
+    """Field-level encryptor bound to a single key.
+
+    The module-level functions delegate to a default instance built from
+    DATA_ENCRYPTION_KEY at import. Tests (or callers juggling multiple
+    keys) construct their own instance instead of mutating the env var
+    and reloading this module, which re-imported cryptography and reran
+    module init per test.
+    """
+
+    def __init__(self, key: Optional[str]):
+        self._fernet = None
+        self.enabled = False
+        if HAS_CRYPTO and key:
+            # Derive a valid Fernet key from the user-provided secret
+            # (Fernet requires a 32-byte URL-safe base64-encoded key)
+            derived = hashlib.sha256(key.encode("utf-8")).digest()
+            self._fernet = Fernet(base64.urlsafe_b64encode(derived))
+            self.enabled = True
+
+    def encrypt_field_bytes(self, value: str) -> bytes:
+        """
+        Encrypt a string value, returning the prefixed token as bytes.
+
+        Fernet already emits bytes; prepending the b'enc:' marker keeps the
+        whole token in bytes for callers that serialize with orjson or write
+        binary JSONL, skipping a decode+concat per field. With encryption
+        disabled the value passes through UTF-8 encoded.
+        """
+        if not value or not self.enabled:
+            return value.encode("utf-8") if value else b""
+        return _ENC_PREFIX + self._fernet.encrypt(value.encode("utf-8"))
+
+    def encrypt_field(self, value: str) -> str:
+        """
+        Encrypt a string value for storage.
+
+        If encryption is enabled, returns a Fernet-encrypted base64 string
+        prefixed with 'enc:' for identification.
+        If encryption is disabled, returns the original value unchanged.
+        """
+        if not value or not self.enabled:
+            return value
+        # Fernet tokens are urlsafe base64; decode via the fast ASCII codec
+        return self.encrypt_field_bytes(value).decode("ascii")
+
+    def decrypt_field(self, value: str) -> str:
+        """
+        Decrypt a previously encrypted field value.
+
+        If the value starts with 'enc:', it is decrypted.
+        Otherwise, it is returned unchanged (backward compatibility with
+        existing plain-text data).
+        """
+        if not value or not value.startswith("enc:"):
+            return value
+        if not self.enabled:
+            warnings.warn(
+                "Encrypted data found but encryption is not enabled. "
+                "Cannot decrypt. Returning raw value.",
+                stacklevel=2,
+            )
+            return value
+        try:
+            encrypted_bytes = value[4:].encode("ascii")
+            return self._fernet.decrypt(encrypted_bytes).decode("utf-8")
+        except (InvalidToken, Exception) as e:
+            warnings.warn(f"Decryption failed: {e}. Returning raw value.", stacklevel=2)
+            return value
+
+    def encrypt_fields(self, values: list) -> list:
+        """
+        Encrypt a batch of values in one pass.
+
+        Reuses this instance's Fernet (which holds the expanded AES key
+        schedule), so a record with several sensitive fields pays the
+        Python call overhead once instead of per field. Fernet is
+        thread-safe, making a shared instance fine under concurrent
+        webhooks.
+        """
+        if not self.enabled:
+            return list(values)
+        return [self.encrypt_field(v) for v in values]
+
+
+if HAS_CRYPTO and not _raw_key:
     warnings.warn(
         f"{_ENCRYPTION_KEY_ENV} not set. Sensitive data will be stored in plain text. "
         f"Set {_ENCRYPTION_KEY_ENV} in .env for production.",
         stacklevel=2,
     )
-else:
-    _fernet = None
-    ENCRYPTION_ENABLED = False
+elif not HAS_CRYPTO:
     warnings.warn(
         "cryptography package not installed. Sensitive data will be stored in plain text. "
         "Install with: pip install cryptography",
         stacklevel=2,
     )
 
+_default = Encryptor(_raw_key)
+ENCRYPTION_ENABLED = _default.enabled
+
 
 # ---------------------------------------------------------------------------
-# Public API
+# Public API (delegates to the default, env-configured Encryptor)
 # ---------------------------------------------------------------------------
 
+
+def encrypt_field_bytes(value: str) -> bytes:
+    """Encrypt a value with the default key, returning the prefixed token as bytes."""
+    return _default.encrypt_field_bytes(value)
+
+
 def encrypt_field(value: str) -> str:
+    """Encrypt a value for storage with the default key."""
+    return _default.encrypt_field(value)
+
+
+def decrypt_field(value: str) -> str:
+    """Decrypt a previously encrypted field value with the default key."""
+    return _default.decrypt_field(value)
+
+
+def encrypt_fields(values: list) -> list:
+    """Encrypt a batch of values in one pass with the default key."""
+    return _default.encrypt_fields(values)
+
+
+def filter_encrypted(values) -> list:
     """
-    Encrypt a string value for storage.
+    Indices of the encrypted entries in a batch of values.
 
-    If encryption is enabled, returns a Fernet-encrypted base64 string
-    prefixed with 'enc:' for identification.
-    If encryption is disabled, returns the original value unchanged.
+    One list comprehension over C-level startswith, so callers working on
+    whole records can find the K encrypted fields without N per-field
+    is_encrypted() calls, then decrypt only those positions.
     """
-    if not value or not ENCRYPTION_ENABLED or not _fernet:
-        return value
-    encrypted = _fernet.encrypt(value.encode("utf-8"))
-    return f"enc:{encrypted.decode('utf-8')}"
+    return [
+        i for i, v in enumerate(values)
+        if isinstance(v, str) and v.startswith("enc:")
+    ]
 
 
-def decrypt_field(value: str) -> str:
+def decrypt_fields(values: list) -> list:
     """
-    Decrypt a previously encrypted field value.
+    Decrypt a batch of values, touching only the ones that are encrypted.
 
-    If the value starts with 'enc:', it is decrypted.
-    Otherwise, it is returned unchanged (backward compatibility with
-    existing plain-text data).
+    Values without the 'enc:' prefix pass through untouched (one C-level
+    startswith check each), so mostly-plaintext batches skip the crypto
+    path entirely.
     """
-    if not value or not value.startswith("enc:"):
-        return value
-    if not ENCRYPTION_ENABLED or not _fernet:
-        warnings.warn(
-            "Encrypted data found but encryption is not enabled. "
-            "Cannot decrypt. Returning raw value.",
-            stacklevel=2,
-        )
-        return value
-    try:
-        encrypted_bytes = value[4:].encode("utf-8")
-        return _fernet.decrypt(encrypted_bytes).decode("utf-8")
-    except (InvalidToken, Exception) as e:
-        warnings.warn(f"Decryption failed: {e}. Returning raw value.", stacklevel=2)
-        return value
+    return [
+        decrypt_field(v) if isinstance(v, str) and v.startswith("enc:") else v
+        for v in values
+    ]
 
 
 def is_encrypted(value: str) -> bool:
@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for Zhang Health.
+
+Serves the Twilio webhook through gevent workers (C-level event loop)
+instead of Werkzeug's single-threaded pure-Python dev server.
+
+Keep workers at 1: the APScheduler reminder job runs inside the worker,
+and multiple workers would double-send reminders.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+bind = "0.0.0.0:5000"
+workers = 1
+worker_class = "gevent"
+
+
+def post_fork(server, worker):
+    """Start the background reminder scheduler once per worker."""
+    from app import start_scheduler
+
+    start_scheduler()
@@ -10,15 +10,36 @@ Supports:
 
 Integrates with foundation MemoryStore for cross-agent access.
 """
+import atexit
 import json
 import logging
 import os
 import re
+import threading
+from bisect import bisect_right
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
-from data_encryption import encrypt_field, decrypt_field
+from data_encryption import encrypt_field
+
+# orjson parses raw JSONL bytes several times faster than stdlib json;
+# fall back gracefully like the other optional imports.
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _dump_line(record: dict) -> bytes:
+        """Serialize a record to a UTF-8 JSONL line (orjson keeps 中文)."""
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+    def _dump_line(record: dict) -> bytes:
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +47,123 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 DATA_DIR = PROJECT_ROOT / "data"
 HEALTH_LOG_FILE = DATA_DIR / "health_log.jsonl"
 
+
+def _member_log_path(member_id: str) -> Path:
+    """Per-member shard of the health log.
+
+    Summaries for one member only need that member's records; sharding at
+    write time keeps reads linear in the member's history instead of the
+    whole family's.
+    """
+    return DATA_DIR / f"health_log.{member_id}.jsonl"
+
+
+# Log files are opened once per process as raw O_APPEND descriptors and
+# kept for the process lifetime: each reading costs one os.write instead
+# of open/write/close syscalls, and POSIX guarantees O_APPEND writes of a
+# single small buffer land atomically — concurrent gunicorn workers can
+# append to the same file without interleaving lines. The lock guards the
+# shared dicts; descriptors are closed at exit.
+_LOG_LOCK = threading.Lock()
+_LOG_FDS: dict = {}
+_FLUSH_EVERY = 8  # latest-map persist cadence, in writes
+_writes_since_flush = 0
+
+
+# Latest reading per (member, type), mirrored to disk so dashboards can
+# render "最近" lines without scanning the JSONL history. The JSONL log
+# stays the source of truth; this map is rebuilt lazily from disk and
+# persisted atomically on the same cadence as the log flushes.
+_LATEST_PATH = DATA_DIR / "health_latest.json"
+_latest: Optional[dict] = None
+_latest_dirty = False
+
+
+def _get_latest_map() -> dict:
+    global _latest
+    if _latest is None:
+        try:
+            with open(_LATEST_PATH, "rb") as f:
+                _latest = _json_loads(f.read())
+        except (OSError, ValueError):
+            _latest = {}
+    return _latest
+
+
+def _save_latest_map() -> None:
+    """Atomically persist the latest-reading map if it has new entries."""
+    global _latest_dirty
+    if not _latest_dirty or _latest is None:
+        return
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = f"{_LATEST_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_latest, f, ensure_ascii=False)
+    os.replace(tmp, _LATEST_PATH)
+    _latest_dirty = False
+
+
+def get_latest(member_id: str) -> dict:
+    """Latest reading per type for a member, without scanning the log."""
+    return _get_latest_map().get(member_id, {})
+
+
+def _migrate_member_history(member_id: str, shard_path: Path) -> None:
+    """Copy a member's pre-sharding records from the global log into their shard.
+
+    Runs once, before a member's first sharded write: without it, the
+    shard-preferring summary path would stop seeing history logged before
+    the shard file existed. Caller holds _LOG_LOCK.
+    """
+    if shard_path.exists() or not HEALTH_LOG_FILE.exists():
+        return
+    lines = []
+    with open(HEALTH_LOG_FILE, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                if _json_loads(line).get("member_id") == member_id:
+                    lines.append(line)
+            except ValueError:
+                continue
+    fd = _get_log_fd(shard_path)
+    if lines:
+        os.write(fd, b"".join(lines))
+        logger.info(f"Migrated {len(lines)} historical records into shard for {member_id}")
+
+
+def _get_log_fd(path: Path) -> int:
+    """Lazily open (and cache) an O_APPEND descriptor for a log file."""
+    fd = _LOG_FDS.get(path)
+    if fd is None:
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        _LOG_FDS[path] = fd
+    return fd
+
+
+def _flush_logs() -> None:
+    """Persist pending latest-map state (appends themselves are unbuffered)."""
+    global _writes_since_flush
+    with _LOG_LOCK:
+        _writes_since_flush = 0
+        _save_latest_map()
+
+
+def _close_log_fds() -> None:
+    with _LOG_LOCK:
+        for fd in _LOG_FDS.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        _LOG_FDS.clear()
+        _save_latest_map()
+
+
+atexit.register(_close_log_fds)
+
 # Foundation MemoryStore integration
 try:
     import sys
@@ -40,26 +178,48 @@ except (ImportError, Exception):
 
 # ─── Parsing Patterns ────────────────────────────────────────────────────────
 
-# Blood pressure: "BP 120/80", "bp120/80", "血压 130/85", "130/80"
-BP_PATTERNS = [
-    re.compile(r"(?:bp|血压|blood\s*pressure)\s*(\d{2,3})\s*/\s*(\d{2,3})", re.IGNORECASE),
-    re.compile(r"^(\d{2,3})\s*/\s*(\d{2,3})$"),  # Just numbers like "120/80"
-]
-
-# Blood sugar: "BS 95", "血糖 5.6", "sugar 100"
-BS_PATTERNS = [
-    re.compile(r"(?:bs|血糖|blood\s*sugar|sugar|glucose)\s*(\d+\.?\d*)", re.IGNORECASE),
-]
+# All reading types combined into one alternation so each SMS enters the
+# regex engine once instead of once per type. The matched branch is
+# identified via match.lastgroup. A single search would resolve texts
+# carrying several readings by leftmost position, so parse_health_data
+# walks finditer and keeps the highest-priority branch — preserving the
+# original type precedence: blood pressure, bare "120/80", blood sugar,
+# weight, heart rate.
+_HEALTH_RE = re.compile(
+    r"(?:bp|血压|blood\s*pressure)\s*(?P<bp_s>\d{2,3})\s*/\s*(?P<bp_d>\d{2,3})"
+    r"|^(?P<bare_s>\d{2,3})\s*/\s*(?P<bare_d>\d{2,3})$"
+    r"|(?:bs|血糖|blood\s*sugar|sugar|glucose)\s*(?P<bs>\d+\.?\d*)"
+    r"|(?:w|体重|weight)\s*(?P<w>\d+\.?\d*)"
+    r"|(?:hr|心率|heart\s*rate|pulse)\s*(?P<hr>\d{2,3})",
+    re.IGNORECASE,
+)
+
+# Type precedence for multi-reading texts, keyed on match.lastgroup.
+# Lower wins; blood pressure outranks everything as the clinically most
+# important reading.
+_HEALTH_PRIORITY = {"bp_d": 0, "bare_d": 1, "bs": 2, "w": 3, "hr": 4}
+
+# Cheap pre-check before the regex: health readings always carry a digit
+# or one of these marker characters/keywords, while most inbound SMS is
+# plain chatter ("ok", "thanks", "好的"). Negatives bail out on a string
+# scan instead of entering the alternation engine.
+_HINT_CHARS = set("0123456789血体心")
+_HINT_KWS = ("bp", "bs", "hr", "weight", "sugar", "glucose", "pulse", "pressure")
+
+
+def _has_cjk(text: str) -> bool:
+    """Chinese-character detection (used to infer kg vs lbs for weight).
+
+    SMS bodies are short, so a short-circuiting range scan beats spinning
+    up the regex machinery for one character class.
+    """
+    return any("一" <= c <= "鿿" for c in text)
 
-# Weight: "W 165", "体重 75", "weight 165"
-WEIGHT_PATTERNS = [
-    re.compile(r"(?:w|体重|weight)\s*(\d+\.?\d*)", re.IGNORECASE),
-]
 
-# Heart rate: "HR 72", "心率 80"
-HR_PATTERNS = [
-    re.compile(r"(?:hr|心率|heart\s*rate|pulse)\s*(\d{2,3})", re.IGNORECASE),
-]
+@lru_cache(maxsize=256)
+def _encrypt_phone(phone: str) -> str:
+    """Cache per-phone ciphertext: the same number recurs on every reading."""
+    return encrypt_field(phone)
 
 
 def parse_health_data(text: str) -> Optional[dict]:
@@ -71,110 +231,125 @@ def parse_health_data(text: str) -> Optional[dict]:
     """
     text = text.strip()
 
-    # Blood pressure
-    for pattern in BP_PATTERNS:
-        match = pattern.search(text)
-        if match:
-            systolic = int(match.group(1))
-            diastolic = int(match.group(2))
-            # Validate ranges
-            if 60 <= systolic <= 250 and 30 <= diastolic <= 150:
-                return {
-                    "type": "blood_pressure",
-                    "systolic": systolic,
-                    "diastolic": diastolic,
-                    "category": _classify_bp(systolic, diastolic),
-                }
+    if not _HINT_CHARS.intersection(text):
+        low = text.lower()
+        if not any(k in low for k in _HINT_KWS):
+            return None
+
+    # Keep the highest-priority reading when the text carries several
+    # ("hr 70 bp 140/90" must record the blood pressure, as before).
+    match = None
+    best = len(_HEALTH_PRIORITY)
+    for m in _HEALTH_RE.finditer(text):
+        priority = _HEALTH_PRIORITY[m.lastgroup]
+        if priority < best:
+            match, best = m, priority
+            if priority == 0:
+                break
+    if not match:
+        return None
+    group = match.lastgroup
+
+    # Blood pressure ("BP 120/80", "\u8840\u538b 130/85", or bare "120/80")
+    if group in ("bp_d", "bare_d"):
+        prefix = "bp" if group == "bp_d" else "bare"
+        systolic = int(match.group(f"{prefix}_s"))
+        diastolic = int(match.group(f"{prefix}_d"))
+        # Validate ranges
+        if 60 <= systolic <= 250 and 30 <= diastolic <= 150:
+            return {
+                "type": "blood_pressure",
+                "systolic": systolic,
+                "diastolic": diastolic,
+                "category": _classify_bp(systolic, diastolic),
+            }
 
     # Blood sugar
-    for pattern in BS_PATTERNS:
-        match = pattern.search(text)
-        if match:
-            value = float(match.group(1))
-            # Detect unit: mg/dL (US) vs mmol/L (international)
-            if value < 30:  # mmol/L
-                unit = "mmol/L"
-                mg_dl = value * 18  # Convert for classification
-            else:
-                unit = "mg/dL"
-                mg_dl = value
-            if 20 <= mg_dl <= 600:
-                return {
-                    "type": "blood_sugar",
-                    "value": value,
-                    "unit": unit,
-                    "category": _classify_bs(mg_dl),
-                }
-
-    # Weight
-    for pattern in WEIGHT_PATTERNS:
-        match = pattern.search(text)
-        if match:
-            value = float(match.group(1))
-            # Detect unit: if Chinese text present, assume kg; otherwise lbs if >100
-            has_chinese = bool(re.search(r'[\u4e00-\u9fff]', text))
-            if has_chinese:
-                unit = "kg"
-            elif value > 100:
-                unit = "lbs"
-            else:
-                unit = "kg"  # Ambiguous, default kg
+    elif group == "bs":
+        value = float(match.group("bs"))
+        # Detect unit: mg/dL (US) vs mmol/L (international)
+        if value < 30:  # mmol/L
+            unit = "mmol/L"
+            mg_dl = value * 18  # Convert for classification
+        else:
+            unit = "mg/dL"
+            mg_dl = value
+        if 20 <= mg_dl <= 600:
             return {
-                "type": "weight",
+                "type": "blood_sugar",
                 "value": value,
                 "unit": unit,
+                "category": _classify_bs(mg_dl),
             }
 
+    # Weight
+    elif group == "w":
+        value = float(match.group("w"))
+        # Detect unit: if Chinese text present, assume kg; otherwise lbs if >100
+        if _has_cjk(text):
+            unit = "kg"
+        elif value > 100:
+            unit = "lbs"
+        else:
+            unit = "kg"  # Ambiguous, default kg
+        return {
+            "type": "weight",
+            "value": value,
+            "unit": unit,
+        }
+
     # Heart rate
-    for pattern in HR_PATTERNS:
-        match = pattern.search(text)
-        if match:
-            value = int(match.group(1))
-            if 30 <= value <= 220:
-                return {
-                    "type": "heart_rate",
-                    "value": value,
-                    "category": _classify_hr(value),
-                }
+    elif group == "hr":
+        value = int(match.group("hr"))
+        if 30 <= value <= 220:
+            return {
+                "type": "heart_rate",
+                "value": value,
+                "category": _classify_hr(value),
+            }
 
     return None
 
 
+# AHA blood-pressure buckets, highest severity first. The old if-chain
+# returned before its crisis check could ever run; walking thresholds
+# top-down makes crisis reachable and keeps one comparison shape per row.
+_BP_BUCKETS = (
+    (180, 120, "crisis"),
+    (140, 90, "high_stage2"),
+    (130, 80, "high_stage1"),
+    (120, 80, "elevated"),
+    (0, 0, "normal"),
+)
+
+# Sorted upper-bound thresholds for bisect-based classification.
+_BS_BOUNDS = (70, 100, 126)
+_BS_LABELS = ("low", "normal", "prediabetic", "diabetic")
+_HR_BOUNDS = (60, 101)
+_HR_LABELS = ("low", "normal", "high")
+
+
+# The classifiers are pure and family members re-send the same handful of
+# readings daily, so memoizing turns repeat classifications into dict hits.
+@lru_cache(maxsize=4096)
 def _classify_bp(systolic: int, diastolic: int) -> str:
     """Classify blood pressure according to AHA guidelines."""
-    if systolic < 120 and diastolic < 80:
-        return "normal"
-    elif systolic < 130 and diastolic < 80:
-        return "elevated"
-    elif systolic < 140 or diastolic < 90:
-        return "high_stage1"
-    elif systolic >= 140 or diastolic >= 90:
-        return "high_stage2"
-    if systolic >= 180 or diastolic >= 120:
-        return "crisis"
+    for s_thr, d_thr, name in _BP_BUCKETS:
+        if systolic >= s_thr or diastolic >= d_thr:
+            return name
     return "unknown"
 
 
+@lru_cache(maxsize=4096)
 def _classify_bs(mg_dl: float) -> str:
     """Classify fasting blood sugar."""
-    if mg_dl < 70:
-        return "low"
-    elif mg_dl < 100:
-        return "normal"
-    elif mg_dl < 126:
-        return "prediabetic"
-    else:
-        return "diabetic"
+    return _BS_LABELS[bisect_right(_BS_BOUNDS, mg_dl)]
 
 
+@lru_cache(maxsize=4096)
 def _classify_hr(bpm: int) -> str:
     """Classify resting heart rate."""
-    if bpm < 60:
-        return "low"
-    elif bpm <= 100:
-        return "normal"
-    else:
-        return "high"
+    return _HR_LABELS[bisect_right(_HR_BOUNDS, bpm)]
 
 
 def log_health_data(
@@ -188,33 +363,49 @@ def log_health_data(
     Returns a response message acknowledging the data.
     """
     now = datetime.now(timezone.utc)
-    record = {
-        "timestamp": now.isoformat(),
-        "member_id": member_id,
-        "phone": encrypt_field(phone),  # Encrypt PII at rest
-        **data,
-    }
-
-    # Append to local JSONL log
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with open(HEALTH_LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    # The parsed dict is ours once handed over; attach the metadata keys
+    # in place instead of allocating a merged copy per reading.
+    data["timestamp"] = now.isoformat()
+    data["ts_ms"] = int(now.timestamp() * 1000)  # integer key for range filters
+    data["member_id"] = member_id
+    data["phone"] = _encrypt_phone(phone)  # Encrypt PII at rest
+    record = data
+
+    # Append to the global JSONL log and the per-member shard. Each line
+    # goes out as one os.write on an O_APPEND descriptor, so records from
+    # concurrent workers never interleave mid-line.
+    line = _dump_line(record)
+    global _writes_since_flush, _latest_dirty
+    with _LOG_LOCK:
+        shard_path = _member_log_path(member_id)
+        if shard_path not in _LOG_FDS:
+            _migrate_member_history(member_id, shard_path)
+        os.write(_get_log_fd(HEALTH_LOG_FILE), line)
+        os.write(_get_log_fd(shard_path), line)
+        _get_latest_map().setdefault(member_id, {})[data["type"]] = record
+        _latest_dirty = True
+        _writes_since_flush += 1
+        if _writes_since_flush >= _FLUSH_EVERY:
+            _writes_since_flush = 0
+            _save_latest_map()
 
     logger.info(f"Health data logged for member {member_id}: type={data.get('type')}")
 
-    # Log to MemoryStore for cross-agent access
+    # Log to MemoryStore for cross-agent access. The phone number stays
+    # out of the shared payload: the memory store has its own retention
+    # and access rules, and the number would land there in plain text
+    # whenever DATA_ENCRYPTION_KEY is unset.
     if HAS_MEMORY and _memory:
         try:
+            memory_payload = {k: v for k, v in data.items() if k != "phone"}
             _memory.log_interaction(
                 "health-agent", member_id,
                 f"Recorded {data['type']} via SMS",
-                data,
+                memory_payload,
             )
             # Update member context with latest reading
             context_key = f"latest_{data['type']}"
-            _memory.update_member_context(member_id, {
-                context_key: {**data, "timestamp": now.isoformat()},
-            })
+            _memory.update_member_context(member_id, {context_key: memory_payload})
         except Exception as e:
             logger.warning(f"MemoryStore logging failed: {e}")
 
@@ -287,66 +478,86 @@ def get_health_summary(member_id: str, days: int = 30) -> str:
     Generate a health summary for a family member over the past N days.
     Reads from the local JSONL log.
     """
-    if not HEALTH_LOG_FILE.exists():
+    _flush_logs()  # persist any pending latest-map updates
+
+    # Prefer the per-member shard; fall back to scanning the global log
+    # for records written before sharding existed.
+    log_path = _member_log_path(member_id)
+    filter_member = False
+    if not log_path.exists():
+        log_path = HEALTH_LOG_FILE
+        filter_member = True
+    if not log_path.exists():
         return "暂无健康记录。"
 
     from datetime import timedelta
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    records = []
-
-    with open(HEALTH_LOG_FILE, "r", encoding="utf-8") as f:
+    # Newer records carry an integer epoch-ms key, so the cutoff check is
+    # an int compare. Records written before ts_ms existed fall back to a
+    # lexicographic compare on the UTC ISO-8601 string — still no datetime
+    # construction per line.
+    cutoff_ms = int(cutoff.timestamp() * 1000)
+    cutoff_iso = cutoff.isoformat()
+
+    # Single pass: accumulate counts/sums per type while streaming the
+    # file instead of collecting per-type record lists and re-summing.
+    stats: dict = {}
+
+    with open(log_path, "rb") as f:
         for line in f:
-            line = line.strip()
-            if not line:
+            if not line.strip():
                 continue
             try:
-                record = json.loads(line)
-                if record.get("member_id") != member_id:
+                record = _json_loads(line)
+                if filter_member and record.get("member_id") != member_id:
+                    continue
+                ts_ms = record.get("ts_ms")
+                if ts_ms is not None:
+                    if ts_ms < cutoff_ms:
+                        continue
+                elif record.get("timestamp", "") < cutoff_iso:
                     continue
-                # Decrypt phone if needed for display
-                if "phone" in record:
-                    record["phone"] = decrypt_field(record["phone"])
-                ts = datetime.fromisoformat(record["timestamp"])
-                if ts >= cutoff:
-                    records.append(record)
-            except (json.JSONDecodeError, KeyError):
+                t = record["type"]
+                st = stats.get(t)
+                if st is None:
+                    st = stats[t] = {"n": 0, "sum_s": 0, "sum_d": 0, "sum_v": 0.0}
+                if t == "blood_pressure":
+                    st["sum_s"] += record["systolic"]
+                    st["sum_d"] += record["diastolic"]
+                elif t in ("blood_sugar", "heart_rate"):
+                    st["sum_v"] += record["value"]
+                st["n"] += 1
+                st["latest"] = record
+            except (ValueError, KeyError):
                 continue
 
-    if not records:
+    if not stats:
         return f"过去 {days} 天暂无健康记录。"
 
-    # Group by type
-    by_type = {}
-    for r in records:
-        t = r["type"]
-        if t not in by_type:
-            by_type[t] = []
-        by_type[t].append(r)
+    # "最近" lines come from the O(1) latest-reading map when it has an
+    # entry; the scan result covers members logged before the map existed.
+    latest_map = get_latest(member_id)
 
     lines = [f"📋 过去 {days} 天健康摘要：\n"]
 
-    if "blood_pressure" in by_type:
-        bps = by_type["blood_pressure"]
-        avg_s = sum(r["systolic"] for r in bps) / len(bps)
-        avg_d = sum(r["diastolic"] for r in bps) / len(bps)
-        lines.append(f"🩸 血压: {len(bps)} 次记录")
-        lines.append(f"   平均: {avg_s:.0f}/{avg_d:.0f} mmHg")
-        latest = bps[-1]
+    bp = stats.get("blood_pressure")
+    if bp:
+        lines.append(f"🩸 血压: {bp['n']} 次记录")
+        lines.append(f"   平均: {bp['sum_s'] / bp['n']:.0f}/{bp['sum_d'] / bp['n']:.0f} mmHg")
+        latest = latest_map.get("blood_pressure") or bp["latest"]
         lines.append(f"   最近: {latest['systolic']}/{latest['diastolic']} ({latest['category']})")
 
-    if "blood_sugar" in by_type:
-        bss = by_type["blood_sugar"]
-        avg = sum(r["value"] for r in bss) / len(bss)
-        lines.append(f"🍬 血糖: {len(bss)} 次记录, 平均 {avg:.1f}")
+    bs = stats.get("blood_sugar")
+    if bs:
+        lines.append(f"🍬 血糖: {bs['n']} 次记录, 平均 {bs['sum_v'] / bs['n']:.1f}")
 
-    if "weight" in by_type:
-        ws = by_type["weight"]
-        latest = ws[-1]
+    w = stats.get("weight")
+    if w:
+        latest = latest_map.get("weight") or w["latest"]
         lines.append(f"⚖️ 体重: 最近 {latest['value']} {latest['unit']}")
 
-    if "heart_rate" in by_type:
-        hrs = by_type["heart_rate"]
-        avg = sum(r["value"] for r in hrs) / len(hrs)
-        lines.append(f"💓 心率: {len(hrs)} 次记录, 平均 {avg:.0f} bpm")
+    hr = stats.get("heart_rate")
+    if hr:
+        lines.append(f"💓 心率: {hr['n']} 次记录, 平均 {hr['sum_v'] / hr['n']:.0f} bpm")
 
     return "\n".join(lines)
@@ -14,15 +14,30 @@ Integrates with zhanghealth SMS system for reminders and tracking.
 
 import json
 import logging
-from dataclasses import dataclass, asdict, field
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta, time
 from pathlib import Path
 from typing import Optional
 
+# C-accelerated JSON for the persistence paths; stdlib fallback keeps the
+# module dependency-free, matching the other optional imports.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+# slots=True drops the per-instance __dict__: lighter records when a whole
+# catalog or adherence history is held in memory, and C-level attribute
+# access. AdherenceRecord is also frozen — records are write-once.
+@dataclass(slots=True)
 class Medication:
     name: str
     dosage: str  # e.g., "10mg", "500mg"
@@ -37,9 +52,23 @@ class Medication:
     active: bool = True
     created_at: str = ""
     interactions: list = field(default_factory=list)  # Known interactions
+    display_name: str = ""  # As-entered form for UI; `name` is canonical
+
+    def __post_init__(self):
+        # `name` is normalized to lowercase once at ingestion so catalog
+        # keys, SMS lookups, and interaction probes compare directly
+        # without a .lower() allocation per check.
+        if not self.display_name:
+            self.display_name = self.name
+        self.name = self.name.lower()
+
+    def to_dict(self) -> dict:
+        """Shallow dict for storage — all fields are already JSON-ready,
+        so this skips asdict()'s recursive deep-copy walk."""
+        return {s: getattr(self, s) for s in self.__slots__}
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AdherenceRecord:
     medication_name: str
     member_id: str
@@ -48,6 +77,10 @@ class AdherenceRecord:
     response_time: str = ""
     method: str = "sms"  # "sms", "manual", "auto"
 
+    def to_dict(self) -> dict:
+        """Shallow dict for JSONL storage (flat fields, no deep copy)."""
+        return {s: getattr(self, s) for s in self.__slots__}
+
 
 # Basic drug interaction rules (simplified)
 KNOWN_INTERACTIONS = {
@@ -60,6 +93,25 @@ KNOWN_INTERACTIONS = {
     ("metoprolol", "verapamil"): "HIGH: Risk of severe bradycardia",
 }
 
+# Compact JSON on disk (smaller files, faster writes); set
+# MED_PRETTY_JSON=1 to get the old indented form for eyeballing.
+_JSON_KWARGS = (
+    {"indent": 2}
+    if os.getenv("MED_PRETTY_JSON") == "1"
+    else {"separators": (",", ":")}
+)
+
+# Adjacency view of the rule table: drug -> [(other_drug, msg), ...].
+# A new med only walks its own interaction partners and set-probes them
+# against the member's meds, so the check scales with the drug's rule
+# count rather than rules x household meds.
+_INTERACTIONS_ADJ: dict = {}
+for _pair, _msg in KNOWN_INTERACTIONS.items():
+    _a, _b = _pair
+    _INTERACTIONS_ADJ.setdefault(_a, []).append((_b, _msg))
+    _INTERACTIONS_ADJ.setdefault(_b, []).append((_a, _msg))
+del _pair, _msg, _a, _b
+
 
 class MedicationManager:
     """Manage family medication schedules and adherence."""
@@ -68,12 +120,79 @@ class MedicationManager:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.meds_file = self.data_dir / "medications.json"
-        self.adherence_file = self.data_dir / "adherence.json"
+        self.adherence_file = self.data_dir / "adherence.jsonl"
+        self._legacy_adherence_file = self.data_dir / "adherence.json"
         self.medications = self._load_medications()
         self.adherence = self._load_adherence()
+        self._rebuild_indexes()
+
+        # SMS command tables: exact matches dispatch in one dict probe,
+        # parameterized commands fall through to a short prefix scan.
+        self._sms_commands = {
+            "MED Y": self._sms_taken_all,
+            "TOOK": self._sms_taken_all,
+            "Y": self._sms_taken_all,
+            "YES": self._sms_taken_all,
+            "MED N": self._sms_skipped_all,
+            "N": self._sms_skipped_all,
+            "NO": self._sms_skipped_all,
+            "MED LIST": self._sms_list,
+        }
+        self._sms_prefix_commands = (
+            ("TOOK ", self._sms_took),
+            ("MED REFILL ", self._sms_refill),
+        )
+
+    def _rebuild_indexes(self):
+        """Rebuild the reminder-time and per-member indexes.
+
+        get_due_reminders runs on every scheduler tick; indexing active
+        medications by "HH:MM" turns a tick into one dict lookup instead
+        of a walk over every medication and every scheduled time. Rebuilt
+        on load and whenever the catalog changes.
+        """
+        self._time_index: dict = {}
+        self._member_index: dict = {}
+        self._meds_by_member: dict = {}
+        self._refill_due: set = set()
+        for key, med_data in self.medications.items():
+            if not med_data.get("active", True):
+                continue
+            member_id = med_data.get("member_id", "")
+            self._member_index.setdefault(member_id, []).append(key)
+            self._meds_by_member.setdefault(member_id, set()).add(
+                med_data["name"].lower()
+            )
+            if med_data.get("supply_remaining", 30) <= med_data.get("refill_threshold", 7):
+                self._refill_due.add(key)
+            for scheduled_time in med_data.get("times", []):
+                self._time_index.setdefault(scheduled_time, []).append({
+                    "member_id": med_data["member_id"],
+                    "medication": med_data["name"],
+                    "dosage": med_data["dosage"],
+                    "scheduled_time": scheduled_time,
+                })
 
     def add_medication(self, med: Medication) -> dict:
         """Add a medication to a family member's schedule."""
+        result = self._insert_medication(med)
+        self._save_medications()
+        self._rebuild_indexes()
+        return result
+
+    def add_medications(self, meds: list) -> list:
+        """Bulk-add medications, deferring the file write until the end.
+
+        Bootstrap/import paths pay for one serialization and one index
+        rebuild instead of one per medication.
+        """
+        results = [self._insert_medication(med) for med in meds]
+        self._save_medications()
+        self._rebuild_indexes()
+        return results
+
+    def _insert_medication(self, med: Medication) -> dict:
+        """Insert a medication into the in-memory catalog (no save)."""
         if not med.created_at:
             med.created_at = datetime.now(timezone.utc).isoformat()
 
@@ -81,8 +200,10 @@ class MedicationManager:
         interactions = self._check_interactions(med)
 
         key = f"{med.member_id}:{med.name}"
-        self.medications[key] = asdict(med)
-        self._save_medications()
+        self.medications[key] = med.to_dict()
+        # Keep the interaction set current so later meds in a bulk add see
+        # this one before the full index rebuild.
+        self._meds_by_member.setdefault(med.member_id, set()).add(med.name.lower())
 
         result = {
             "status": "added",
@@ -99,10 +220,11 @@ class MedicationManager:
 
     def remove_medication(self, member_id: str, med_name: str) -> dict:
         """Remove a medication from schedule."""
-        key = f"{member_id}:{med_name}"
+        key = f"{member_id}:{med_name.lower()}"
         if key in self.medications:
             self.medications[key]["active"] = False
             self._save_medications()
+            self._rebuild_indexes()
             return {"status": "removed", "medication": med_name}
         return {"status": "not_found", "medication": med_name}
 
@@ -111,23 +233,8 @@ class MedicationManager:
         if current_time is None:
             current_time = datetime.now(timezone.utc)
 
-        current_hour_min = current_time.strftime("%H:%M")
-        due = []
-
-        for key, med_data in self.medications.items():
-            if not med_data.get("active", True):
-                continue
-
-            for scheduled_time in med_data.get("times", []):
-                if scheduled_time == current_hour_min:
-                    due.append({
-                        "member_id": med_data["member_id"],
-                        "medication": med_data["name"],
-                        "dosage": med_data["dosage"],
-                        "scheduled_time": scheduled_time,
-                    })
-
-        return due
+        # Copy so callers can't mutate the index entries
+        return list(self._time_index.get(current_time.strftime("%H:%M"), []))
 
     def record_adherence(
         self,
@@ -135,21 +242,30 @@ class MedicationManager:
         med_name: str,
         taken: bool,
         scheduled_time: str = "",
+        now: Optional[datetime] = None,
     ) -> dict:
-        """Record whether a medication was taken."""
+        """Record whether a medication was taken.
+
+        Bulk callers (e.g. a "MED Y" fan-out over all due meds) pass one
+        `now` so the batch reads the clock and formats timestamps once.
+        """
+        if now is None:
+            now = datetime.now(timezone.utc)
         record = AdherenceRecord(
             medication_name=med_name,
             member_id=member_id,
-            scheduled_time=scheduled_time or datetime.now(timezone.utc).strftime("%H:%M"),
+            scheduled_time=scheduled_time or now.strftime("%H:%M"),
             taken=taken,
-            response_time=datetime.now(timezone.utc).isoformat(),
+            response_time=now.isoformat(),
         )
 
-        date_key = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        date_key = now.strftime("%Y-%m-%d")
+        record_dict = record.to_dict()
+        record_dict["date"] = date_key
         if date_key not in self.adherence:
             self.adherence[date_key] = []
-        self.adherence[date_key].append(asdict(record))
-        self._save_adherence()
+        self.adherence[date_key].append(record_dict)
+        self._append_adherence(record_dict)
 
         return {
             "status": "recorded",
@@ -159,23 +275,23 @@ class MedicationManager:
         }
 
     def get_refill_alerts(self) -> list:
-        """Check which medications need refills soon."""
-        alerts = []
-        for key, med_data in self.medications.items():
-            if not med_data.get("active", True):
-                continue
+        """Check which medications need refills soon.
 
+        O(alerts): the refill-due set is maintained incrementally (on
+        load, add, and refill), so the scheduler tick doesn't rescan the
+        whole catalog alongside get_due_reminders.
+        """
+        alerts = []
+        for key in self._refill_due:
+            med_data = self.medications[key]
             remaining = med_data.get("supply_remaining", 30)
-            threshold = med_data.get("refill_threshold", 7)
-
-            if remaining <= threshold:
-                alerts.append({
-                    "member_id": med_data["member_id"],
-                    "medication": med_data["name"],
-                    "supply_remaining": remaining,
-                    "pharmacy": med_data.get("pharmacy", ""),
-                    "urgency": "critical" if remaining <= 2 else "warning",
-                })
+            alerts.append({
+                "member_id": med_data["member_id"],
+                "medication": med_data["name"],
+                "supply_remaining": remaining,
+                "pharmacy": med_data.get("pharmacy", ""),
+                "urgency": "critical" if remaining <= 2 else "warning",
+            })
 
         return alerts
 
@@ -188,45 +304,41 @@ class MedicationManager:
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=days)
 
-        total_scheduled = 0
-        total_taken = 0
-        by_medication = {}
+        # Date keys are "YYYY-MM-DD", which sorts lexicographically, so the
+        # window test is two string compares per day — no strptime parsing
+        # of keys that fall outside the report window.
+        start_key = start_date.strftime("%Y-%m-%d")
+        end_key = end_date.strftime("%Y-%m-%d")
 
-        for date_key, records in self.adherence.items():
-            try:
-                record_date = datetime.strptime(date_key, "%Y-%m-%d").replace(
-                    tzinfo=timezone.utc
-                )
-            except ValueError:
-                continue
+        # Two flat int counters per med instead of nested per-med dicts:
+        # one increment (plus one for taken) per record in the window.
+        scheduled = defaultdict(int)
+        taken = defaultdict(int)
 
-            if record_date < start_date or record_date > end_date:
+        for date_key, records in self.adherence.items():
+            if not start_key <= date_key <= end_key:
                 continue
 
             for record in records:
                 if record.get("member_id") != member_id:
                     continue
-
                 med_name = record.get("medication_name", "")
-                if med_name not in by_medication:
-                    by_medication[med_name] = {"scheduled": 0, "taken": 0}
-
-                by_medication[med_name]["scheduled"] += 1
-                total_scheduled += 1
-
+                scheduled[med_name] += 1
                 if record.get("taken", False):
-                    by_medication[med_name]["taken"] += 1
-                    total_taken += 1
+                    taken[med_name] += 1
 
+        total_scheduled = sum(scheduled.values())
+        total_taken = sum(taken.values())
         overall_rate = (total_taken / total_scheduled * 100) if total_scheduled > 0 else 0
 
         med_rates = {}
-        for med_name, counts in by_medication.items():
-            rate = (counts["taken"] / counts["scheduled"] * 100) if counts["scheduled"] > 0 else 0
+        for med_name, n_scheduled in scheduled.items():
+            n_taken = taken[med_name]
+            rate = n_taken / n_scheduled * 100
             med_rates[med_name] = {
                 "adherence_rate": round(rate, 1),
-                "taken": counts["taken"],
-                "scheduled": counts["scheduled"],
+                "taken": n_taken,
+                "scheduled": n_scheduled,
                 "status": "good" if rate >= 80 else "needs_improvement",
             }
 
@@ -248,76 +360,75 @@ class MedicationManager:
         - "MED LIST" — list current medications
         - "MED REFILL aspirin" — mark refill received
         - "TOOK aspirin" — mark specific medication as taken
+
+        Dispatch is a dict lookup for exact commands plus a short prefix
+        table, so the common replies resolve in one probe instead of
+        walking an if/startswith chain.
         """
         text = text.strip().upper()
 
-        if text in ("MED Y", "TOOK", "Y", "YES"):
-            # Mark all due medications as taken
-            due = self.get_due_reminders()
-            results = []
-            for item in due:
-                if item["member_id"] == member_id:
-                    r = self.record_adherence(member_id, item["medication"], True)
-                    results.append(r)
-            return {"action": "taken_all", "results": results}
-
-        if text in ("MED N", "N", "NO"):
-            due = self.get_due_reminders()
-            results = []
-            for item in due:
-                if item["member_id"] == member_id:
-                    r = self.record_adherence(member_id, item["medication"], False)
-                    results.append(r)
-            return {"action": "skipped_all", "results": results}
-
-        if text.startswith("TOOK "):
-            med_name = text[5:].strip().lower()
-            r = self.record_adherence(member_id, med_name, True)
-            return {"action": "taken_specific", "result": r}
-
-        if text == "MED LIST":
-            active_meds = [
-                {
-                    "name": m["name"],
-                    "dosage": m["dosage"],
-                    "times": m["times"],
-                }
-                for m in self.medications.values()
-                if m.get("member_id") == member_id and m.get("active", True)
-            ]
-            return {"action": "list", "medications": active_meds}
-
-        if text.startswith("MED REFILL "):
-            med_name = text[11:].strip().lower()
-            key = f"{member_id}:{med_name}"
-            if key in self.medications:
-                self.medications[key]["supply_remaining"] = 30
-                self._save_medications()
-                return {"action": "refill", "medication": med_name, "new_supply": 30}
+        handler = self._sms_commands.get(text)
+        if handler:
+            return handler(member_id)
 
-        return {"action": "unknown", "raw": text}
+        for prefix, prefix_handler in self._sms_prefix_commands:
+            if text.startswith(prefix):
+                return prefix_handler(member_id, text[len(prefix):].strip().lower())
 
-    def _check_interactions(self, new_med: Medication) -> list:
-        """Check for drug interactions with existing medications."""
-        warnings = []
-        new_name = new_med.name.lower()
+        return {"action": "unknown", "raw": text}
 
-        for key, existing in self.medications.items():
-            if existing.get("member_id") != new_med.member_id:
-                continue
-            if not existing.get("active", True):
-                continue
+    def _record_all_due(self, member_id: str, taken: bool, action: str) -> dict:
+        """Record all currently-due medications for a member as taken/skipped."""
+        now = datetime.now(timezone.utc)
+        results = [
+            self.record_adherence(member_id, item["medication"], taken, now=now)
+            for item in self.get_due_reminders(now)
+            if item["member_id"] == member_id
+        ]
+        return {"action": action, "results": results}
+
+    def _sms_taken_all(self, member_id: str) -> dict:
+        return self._record_all_due(member_id, True, "taken_all")
+
+    def _sms_skipped_all(self, member_id: str) -> dict:
+        return self._record_all_due(member_id, False, "skipped_all")
+
+    def _sms_list(self, member_id: str) -> dict:
+        active_meds = [
+            {
+                "name": self.medications[k].get("display_name")
+                or self.medications[k]["name"],
+                "dosage": self.medications[k]["dosage"],
+                "times": self.medications[k]["times"],
+            }
+            for k in self._member_index.get(member_id, [])
+        ]
+        return {"action": "list", "medications": active_meds}
 
-            existing_name = existing["name"].lower()
-            pair1 = (new_name, existing_name)
-            pair2 = (existing_name, new_name)
+    def _sms_took(self, member_id: str, med_name: str) -> dict:
+        r = self.record_adherence(member_id, med_name, True)
+        return {"action": "taken_specific", "result": r}
 
-            if pair1 in KNOWN_INTERACTIONS:
-                warnings.append(KNOWN_INTERACTIONS[pair1])
-            elif pair2 in KNOWN_INTERACTIONS:
-                warnings.append(KNOWN_INTERACTIONS[pair2])
+    def _sms_refill(self, member_id: str, med_name: str) -> dict:
+        key = f"{member_id}:{med_name}"
+        if key in self.medications:
+            self.medications[key]["supply_remaining"] = 30
+            self._refill_due.discard(key)
+            self._save_medications()
+            return {"action": "refill", "medication": med_name, "new_supply": 30}
+        return {"action": "unknown", "raw": f"MED REFILL {med_name.upper()}"}
 
-        return warnings
+    def _check_interactions(self, new_med: Medication) -> list:
+        """Check for drug interactions with the member's active medications."""
+        member_meds = self._meds_by_member.get(new_med.member_id)
+        if not member_meds:
+            return []
+        # new_med.name is canonical lowercase via __post_init__
+        return [
+            msg
+            for other, msg in _INTERACTIONS_ADJ.get(new_med.name, ())
+            if other in member_meds
+        ]
 
     def _assess_adherence(self, rate: float) -> str:
         """Assess adherence rate."""
@@ -331,24 +442,80 @@ class MedicationManager:
             return "Low adherence. Please discuss with healthcare provider."
 
     def _load_medications(self) -> dict:
-        if self.meds_file.exists():
-            with open(self.meds_file, "r") as f:
-                return json.load(f)
-        return {}
+        if not self.meds_file.exists():
+            return {}
+        with open(self.meds_file, "rb") as f:
+            raw = _json_loads(f.read())
+        # Canonicalize entries written before names were lowercased at
+        # ingestion: keys and `name` fields may carry as-entered casing
+        # (e.g. "mom:Lisinopril"), which the lowercase lookup paths in
+        # remove_medication and _sms_refill would miss. The as-entered
+        # form is preserved in display_name, matching __post_init__.
+        medications: dict = {}
+        for key, med_data in raw.items():
+            name = med_data.get("name", "")
+            if name != name.lower():
+                if not med_data.get("display_name"):
+                    med_data["display_name"] = name
+                med_data["name"] = name.lower()
+                key = f"{med_data.get('member_id', '')}:{med_data['name']}"
+            medications[key] = med_data
+        return medications
 
     def _save_medications(self):
-        with open(self.meds_file, "w") as f:
-            json.dump(self.medications, f, indent=2)
+        # Write-then-rename so a crash mid-write can't leave a torn
+        # catalog file behind.
+        tmp = f"{self.meds_file}.tmp"
+        if orjson is not None and "indent" not in _JSON_KWARGS:
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(self.medications))
+        else:
+            with open(tmp, "w") as f:
+                json.dump(self.medications, f, **_JSON_KWARGS)
+        os.replace(tmp, self.meds_file)
 
     def _load_adherence(self) -> dict:
+        """Stream adherence history into a date-keyed dict.
+
+        Storage is JSON Lines — one compact record per line — so recording
+        a reply appends O(1) bytes instead of rewriting the whole history.
+        A pre-migration adherence.json (whole-dict form) is folded in first
+        when present.
+        """
+        adherence: dict = {}
+        if self._legacy_adherence_file.exists():
+            with open(self._legacy_adherence_file, "rb") as f:
+                adherence = _json_loads(f.read())
         if self.adherence_file.exists():
-            with open(self.adherence_file, "r") as f:
-                return json.load(f)
-        return {}
+            with open(self.adherence_file, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = _json_loads(line)
+                    except ValueError:
+                        continue
+                    adherence.setdefault(record.get("date", ""), []).append(record)
+        return adherence
+
+    def _append_adherence(self, record: dict):
+        if orjson is not None:
+            line = orjson.dumps(record) + b"\n"
+        else:
+            line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(self.adherence_file, "ab") as f:
+            f.write(line)
+
+
+@lru_cache(maxsize=1)
+def get_manager() -> MedicationManager:
+    """The process-wide MedicationManager, built on first use.
 
-    def _save_adherence(self):
-        with open(self.adherence_file, "w") as f:
-            json.dump(self.adherence, f, indent=2)
+    Request handlers should use this instead of instantiating their own
+    manager, so the catalog and adherence history are parsed once per
+    process rather than once per webhook. Same pattern as app.get_store().
+    """
+    return MedicationManager()
 
 
 if __name__ == "__main__":
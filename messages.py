@@ -5,6 +5,12 @@ Provides age-appropriate exercise instructions in both English and Chinese.
 
 import random
 from datetime import datetime
+from typing import Optional
+
+# Module-private generator: phrase picks don't contend on the shared
+# random-module state, and batch senders can pass their own seeded
+# Random for reproducible fan-outs.
+_rng = random.Random()
 
 # ---------------------------------------------------------------------------
 # Exercise plans keyed by plan name.
@@ -93,7 +99,36 @@ MOTIVATIONS_CN = [
 CONFIRMATION_PROMPT = "\n\n✅ 做完了请回复 OK\n❌ 如需暂停提醒请回复 NO"
 
 
-def get_exercise_message(user_name: str, plan_name: str, message_index: int = 0) -> str:
+def _build_routine_template(routine: dict) -> str:
+    """Join a routine's fixed lines once, leaving only the per-send slots."""
+    lines = [
+        "{greeting} {user_name}，",
+        "",
+        f"📋 今天的锻炼计划: {routine['title']}",
+        "",
+    ]
+    lines.extend(f"  {exercise}" for exercise in routine["exercises"])
+    lines.extend(["", routine["tips"], "", "{motivation}", CONFIRMATION_PROMPT])
+    return "\n".join(lines)
+
+
+# The routines are static; only the greeting, motivation, and recipient
+# name vary per send. Pre-join each routine into a template at import so a
+# morning burst formats one string per user instead of rebuilding and
+# joining the line list every time.
+_ROUTINE_TEMPLATES = {
+    (plan_name, index): _build_routine_template(routine)
+    for plan_name, plan in EXERCISE_PLANS.items()
+    for index, routine in enumerate(plan)
+}
+
+
+def get_exercise_message(
+    user_name: str,
+    plan_name: str,
+    message_index: int = 0,
+    rng: Optional[random.Random] = None,
+) -> str:
     """
     Generate a personalized exercise reminder message.
 
@@ -101,38 +136,22 @@ def get_exercise_message(user_name: str, plan_name: str, message_index: int = 0)
         user_name: The recipient's name.
         plan_name: The exercise plan key (e.g., "senior_beginner").
         message_index: Used to rotate through different routines.
+        rng: Optional Random instance; batch senders can share one.
 
     Returns:
         A formatted message string ready to send via SMS.
     """
-    plan = EXERCISE_PLANS.get(plan_name, EXERCISE_PLANS["senior_beginner"])
-    routine = plan[message_index % len(plan)]
-
-    greeting = random.choice(GREETINGS_CN)
-    motivation = random.choice(MOTIVATIONS_CN)
-
-    lines = [
-        f"{greeting} {user_name}，",
-        f"",
-        f"📋 今天的锻炼计划: {routine['title']}",
-        f"",
-    ]
-
-    for exercise in routine["exercises"]:
-        lines.append(f"  {exercise}")
-
-    lines.extend(
-        [
-            f"",
-            routine["tips"],
-            f"",
-            motivation,
-            CONFIRMATION_PROMPT,
-        ]
+    if plan_name not in EXERCISE_PLANS:
+        plan_name = "senior_beginner"
+    template = _ROUTINE_TEMPLATES[(plan_name, message_index % len(EXERCISE_PLANS[plan_name]))]
+
+    rng = rng or _rng
+    return template.format(
+        greeting=rng.choice(GREETINGS_CN),
+        user_name=user_name,
+        motivation=rng.choice(MOTIVATIONS_CN),
     )
 
-    return "\n".join(lines)
-
 
 def get_opt_out_confirmation(user_name: str) -> str:
     """Message sent when a user opts out."""
@@ -160,4 +179,4 @@ def get_ok_acknowledgment(user_name: str) -> str:
         f"🌟 {user_name} 真厉害！又完成了一天的锻炼！",
         f"❤️ {user_name}，做得好！休息一下，明天继续加油！",
     ]
-    return random.choice(responses)
+    return _rng.choice(responses)
@@ -9,11 +9,19 @@ Backward-compatible: reads both plain-text and encrypted phone numbers.
 import json
 import os
 import logging
+from bisect import bisect_right
 from datetime import datetime, date, timezone
 from typing import Optional
 from config import Config
 from data_encryption import encrypt_field, decrypt_field, is_encrypted
 
+# C-accelerated JSON for the store file; stdlib fallback keeps the module
+# dependency-free, matching the other optional imports.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,19 +44,47 @@ class User:
         notes: str = "",
     ):
         self.name = name
-        # Decrypt phone on load (handles both encrypted and plain-text)
-        self.phone = decrypt_field(phone)
+        # Decrypt phone on load (handles both encrypted and plain-text).
+        # The setter keeps the original ciphertext so saves can reuse it.
+        self.phone = phone
         self.timezone = timezone  # e.g. "America/Los_Angeles"
         self.age = age
         self.preferred_hour = preferred_hour  # Hour in local time (0-23)
         self.active = active
         self.cadence_days = cadence_days  # Send every N days
-        self.last_sent_date = last_sent_date  # ISO date string
+        # ISO date string; the setter caches its ordinal for integer math
+        self.last_sent_date = last_sent_date
         self.last_reply = last_reply
         self.last_reply_date = last_reply_date
         self.exercise_plan = exercise_plan or "default"
         self.notes = notes
 
+    @property
+    def last_sent_date(self) -> Optional[str]:
+        """ISO date of the last reminder sent, or None."""
+        return self._last_sent_date
+
+    @last_sent_date.setter
+    def last_sent_date(self, value: Optional[str]):
+        self._last_sent_date = value
+        # Parse once at assignment; the scheduling math below runs on the
+        # cached ordinal instead of re-parsing the ISO string per tick.
+        self.last_sent_ordinal = date.fromisoformat(value).toordinal() if value else None
+
+    @property
+    def phone(self) -> str:
+        """Plain-text phone number (decrypted once, at assignment)."""
+        return self._phone
+
+    @phone.setter
+    def phone(self, value: str):
+        if is_encrypted(value):
+            self._phone = decrypt_field(value)
+            self._phone_ct = value
+        else:
+            self._phone = value
+            self._phone_ct = None
+
     def to_dict(self) -> dict:
         """Serialize to dict. Phone is returned in plain text for API responses."""
         return {
@@ -67,24 +103,34 @@ class User:
         }
 
     def to_storage_dict(self) -> dict:
-        """Serialize to dict for file storage. Phone is encrypted."""
+        """Serialize to dict for file storage. Phone is encrypted.
+
+        Reuses the ciphertext the user was loaded with when the number
+        hasn't changed — Fernet encryption is nondeterministic, so this
+        both skips a crypto call per user per save and keeps the stored
+        file stable across no-op saves.
+        """
         d = self.to_dict()
-        d["phone"] = encrypt_field(self.phone)
+        d["phone"] = self._phone_ct or encrypt_field(self._phone)
         return d
 
     @classmethod
     def from_dict(cls, data: dict) -> "User":
         return cls(**data)
 
+    def next_due_ordinal(self) -> int:
+        """Proleptic ordinal of the next scheduled reminder (0 when never sent, i.e. due now)."""
+        if self.last_sent_ordinal is None:
+            return 0
+        return self.last_sent_ordinal + self.cadence_days
+
     def should_send_today(self, today: date) -> bool:
         """Determine if a message should be sent to this user today."""
         if not self.active:
             return False
-        if self.last_sent_date is None:
+        if self.last_sent_ordinal is None:
             return True
-        last_sent = date.fromisoformat(self.last_sent_date)
-        days_since = (today - last_sent).days
-        return days_since >= self.cadence_days
+        return today.toordinal() - self.last_sent_ordinal >= self.cadence_days
 
 
 class UserStore:
@@ -92,6 +138,14 @@ class UserStore:
 
     def __init__(self, filepath: Optional[str] = None):
         self.filepath = filepath or Config.USERS_FILE
+        self._cache: Optional[list[User]] = None
+        self._cache_mtime: int = 0
+        self._active_count = 0
+        self._dicts: Optional[list[dict]] = None
+        self._by_phone: dict[str, User] = {}
+        self._active_users: list[User] = []
+        self._due_keys: list[int] = []
+        self._due_order: list[User] = []
         self._ensure_data_dir()
 
     def _ensure_data_dir(self):
@@ -99,15 +153,40 @@ class UserStore:
         data_dir = os.path.dirname(self.filepath)
         os.makedirs(data_dir, exist_ok=True)
 
+    def _refresh_cache(self, users: list[User], mtime: int):
+        """Install a freshly parsed user list and its denormalized counts."""
+        self._cache = users
+        self._cache_mtime = mtime
+        self._dicts = None
+        self._by_phone = {u.phone: u for u in users}
+        self._active_users = [u for u in users if u.active]
+        self._active_count = len(self._active_users)
+        # Due index: active users sorted by next-due day ordinal, so one
+        # bisect against today's ordinal slices the ready prefix.
+        order = sorted(((u.next_due_ordinal(), u) for u in self._active_users), key=lambda e: e[0])
+        self._due_keys = [k for k, _ in order]
+        self._due_order = [u for _, u in order]
+
     def load_users(self) -> list[User]:
-        """Load all users from the JSON file. Handles both encrypted and plain-text data."""
+        """Load all users from the JSON file. Handles both encrypted and plain-text data.
+
+        The parsed list is cached in memory and only re-read when the
+        file's mtime changes, so repeated calls don't re-parse identical
+        JSON from disk.
+        """
         if not os.path.exists(self.filepath):
             logger.warning(f"Users file not found at {self.filepath}. Returning empty list.")
             return []
         try:
-            with open(self.filepath, "r") as f:
-                data = json.load(f)
-            return [User.from_dict(u) for u in data.get("users", [])]
+            # st_mtime_ns avoids float truncation missing sub-second rewrites
+            mtime = os.stat(self.filepath).st_mtime_ns
+            if self._cache is not None and mtime == self._cache_mtime:
+                return self._cache
+            with open(self.filepath, "rb") as f:
+                raw = f.read()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            self._refresh_cache([User.from_dict(u) for u in data.get("users", [])], mtime)
+            return self._cache
         except (json.JSONDecodeError, KeyError) as e:
             logger.error(f"Error loading users file: {e}")
             return []
@@ -118,28 +197,83 @@ class UserStore:
             "users": [u.to_storage_dict() for u in users],
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }
-        with open(self.filepath, "w") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Write-then-rename: os.replace is atomic, so readers (and a crash
+        # mid-write) never see a half-written users file. The fsync makes
+        # the rename durable — without it a power loss can leave the new
+        # name pointing at unflushed data.
+        tmp = f"{self.filepath}.tmp"
+        if orjson is not None:
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self.filepath)
+        # Keep the in-memory cache warm so the write doesn't force a re-read
+        self._refresh_cache(users, os.stat(self.filepath).st_mtime_ns)
         logger.info(f"Saved {len(users)} users to {self.filepath}")
 
-    def get_user_by_phone(self, phone: str) -> Optional[User]:
-        """Find a user by their phone number (compares decrypted values)."""
+    def to_dicts(self) -> list[dict]:
+        """Serialized view of all users for API responses.
+
+        Built lazily and reused until the cache refreshes, so repeated
+        /api/users calls don't re-walk every User into fresh dicts.
+        """
         users = self.load_users()
-        for user in users:
-            if user.phone == phone:
-                return user
-        return None
+        if self._dicts is None:
+            self._dicts = [u.to_dict() for u in users]
+        return self._dicts
+
+    @property
+    def user_count(self) -> int:
+        """Total number of users. O(1) once the cache is warm."""
+        return len(self.load_users())
+
+    @property
+    def active_count(self) -> int:
+        """Number of active users, maintained alongside the cache."""
+        self.load_users()  # refresh if the file changed
+        return self._active_count
+
+    def get_user_by_phone(self, phone: str) -> Optional[User]:
+        """Find a user by their phone number (compares decrypted values).
+
+        O(1) via the phone index built alongside the cache.
+        """
+        self.load_users()
+        return self._by_phone.get(phone)
+
+    def active_users(self) -> list[User]:
+        """Only the active users, filtered once per cache refresh."""
+        self.load_users()
+        return self._active_users
+
+    def due_users(self, today: date) -> list[User]:
+        """Active users whose next reminder date has arrived, longest-overdue first.
+
+        Backed by the due index, so per-tick work scales with the number
+        of due users rather than evaluating should_send_today for all of
+        them. The index is rebuilt whenever the cache refreshes (load or
+        save), which covers last_sent_date updates.
+        """
+        self.load_users()
+        cut = bisect_right(self._due_keys, today.toordinal())
+        return self._due_order[:cut]
 
     def update_user(self, phone: str, **kwargs):
         """Update a user's fields by phone number."""
         users = self.load_users()
-        for user in users:
-            if user.phone == phone:
-                for key, value in kwargs.items():
-                    if hasattr(user, key):
-                        setattr(user, key, value)
-                self.save_users(users)
-                logger.info(f"Updated user {user.name}: {list(kwargs.keys())}")
-                return True
-        logger.warning(f"User not found for update.")
-        return False
+        user = self._by_phone.get(phone)
+        if user is None:
+            logger.warning("User not found for update.")
+            return False
+        for key, value in kwargs.items():
+            if hasattr(user, key):
+                setattr(user, key, value)
+        self.save_users(users)
+        logger.info(f"Updated user {user.name}: {list(kwargs.keys())}")
+        return True
@@ -5,7 +5,12 @@ Handles sending messages and logging delivery status.
 
 import logging
 import os
-from datetime import datetime, date, timezone
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, time as dt_time, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
 import pytz
@@ -21,6 +26,66 @@ from messages import (
 
 logger = logging.getLogger(__name__)
 
+# Minimum spacing between full reminder checks. The hourly tick and the
+# manual /api/send-now trigger run the same scan; back-to-back runs are
+# redundant work and risk double-sending against Twilio rate limits.
+MIN_RUN_INTERVAL_SECONDS = 300
+
+# Cap on concurrent Twilio requests during a reminder fan-out. The pool
+# bound doubles as the throughput limit: at most this many HTTPS round
+# trips are in flight, which keeps us under Twilio's per-number MPS.
+MAX_SEND_WORKERS = 10
+
+
+@lru_cache(maxsize=512)
+def _tz(name: str) -> pytz.BaseTzInfo:
+    """Memoized pytz.timezone: the tz-data lookup is paid once per name."""
+    return pytz.timezone(name)
+
+
+# Reply-intent vocabulary. The merged dict classifies a normalized reply
+# in one hash lookup instead of a membership scan per intent, and grows
+# without adding per-message cost.
+_OPT_OUT = frozenset({"no", "stop", "unsubscribe", "quit", "cancel"})
+_OPT_IN = frozenset({"start", "yes", "resume", "subscribe"})
+_OK = frozenset({"ok", "done", "完成", "做了", "好"})
+_INTENT = (
+    {word: "opt_out" for word in _OPT_OUT}
+    | {word: "opt_in" for word in _OPT_IN}
+    | {word: "ok" for word in _OK}
+)
+
+# Real SMS replies arrive as "OK!", " stop. ", "完成！" and so on. One
+# anchored, case-insensitive scan tolerates surrounding whitespace and
+# trailing punctuation so those still classify instead of falling
+# through to the generic acknowledgment. Built from the vocabulary sets
+# above so new keywords stay single-source.
+_INTENT_RE = re.compile(
+    r"^\s*(?P<word>" + "|".join(sorted(_INTENT, key=len, reverse=True)) + r")"
+    r"[\s.!?~。！？]*$",
+    re.IGNORECASE,
+)
+
+
+# Process-wide Twilio client. The Client owns the TLS session and HTTP
+# connection pool, so every SMSSender sharing one instance amortizes the
+# handshake across all sends instead of paying it per construction.
+_twilio_client = None
+_twilio_client_lock = threading.Lock()
+
+
+def _get_twilio_client():
+    """Return the shared Twilio Client, creating it on first use."""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_client_lock:
+            if _twilio_client is None:
+                from twilio.rest import Client
+
+                _twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+                logger.info("Twilio client initialized successfully.")
+    return _twilio_client
+
 
 class SMSSender:
     """Handles sending SMS messages via Twilio."""
@@ -39,10 +104,7 @@ class SMSSender:
 
         if not dry_run:
             try:
-                from twilio.rest import Client
-
-                self.client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
-                logger.info("Twilio client initialized successfully.")
+                self.client = _get_twilio_client()
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {e}")
                 logger.warning("Falling back to dry-run mode.")
@@ -75,6 +137,29 @@ class SMSSender:
             logger.error(f"Failed to send message to {to_number}: {e}")
             return None
 
+    def build_exercise_reminder(self, user: User, today_ord: Optional[int] = None) -> str:
+        """
+        Render the exercise reminder body for a user without sending it.
+
+        Args:
+            user: The User object the reminder is for.
+            today_ord: Today as a day ordinal; batch callers compute it
+                once per tick instead of per user.
+
+        Returns:
+            The formatted message body.
+        """
+        # Calculate which routine to send (rotates through the plan).
+        # Pure integer math on the ordinal cached by the User setter.
+        if user.last_sent_ordinal is not None:
+            if today_ord is None:
+                today_ord = date.today().toordinal()
+            message_index = (today_ord - user.last_sent_ordinal) // user.cadence_days
+        else:
+            message_index = 0
+
+        return get_exercise_message(user.name, user.exercise_plan, message_index)
+
     def send_exercise_reminder(self, user: User) -> bool:
         """
         Send an exercise reminder to a specific user.
@@ -85,16 +170,7 @@ class SMSSender:
         Returns:
             True if the message was sent successfully.
         """
-        # Calculate which routine to send (rotates through the plan)
-        if user.last_sent_date:
-            last = date.fromisoformat(user.last_sent_date)
-            days_since_start = (date.today() - last).days
-            message_index = days_since_start // user.cadence_days
-        else:
-            message_index = 0
-
-        body = get_exercise_message(user.name, user.exercise_plan, message_index)
-        sid = self.send_message(user.phone, body)
+        sid = self.send_message(user.phone, self.build_exercise_reminder(user))
         return sid is not None
 
 
@@ -107,59 +183,125 @@ class ReminderScheduler:
     def __init__(self, dry_run: bool = False):
         self.sender = SMSSender(dry_run=dry_run)
         self.store = UserStore()
+        self._last_run_ts = 0.0
+        self._run_lock = threading.Lock()
 
-    def check_and_send_reminders(self):
+    def check_and_send_reminders(self) -> bool:
         """
         Check all users and send reminders to those who are due.
         This method is called by the scheduler (e.g., every hour).
+        Overlapping triggers (scheduler tick vs. manual /api/send-now)
+        are coalesced: a run within the last few minutes skips.
+
+        Returns True when the check actually ran, False when it was
+        coalesced away — callers that re-arm the scheduler must retry a
+        skipped run soon rather than sleeping until the next due slot.
         """
+        with self._run_lock:
+            now = time.time()
+            if now - self._last_run_ts < MIN_RUN_INTERVAL_SECONDS:
+                logger.info("Reminder check ran recently; skipping redundant run.")
+                return False
+            self._last_run_ts = now
+
         logger.info("=== Running reminder check ===")
         users = self.store.load_users()
 
         if not users:
             logger.warning("No users found. Skipping reminder check.")
-            return
+            return True
 
         today = date.today()
-        sent_count = 0
-
-        for user in users:
-            if not user.active:
-                logger.debug(f"Skipping inactive user: {user.name}")
-                continue
-
-            if not user.should_send_today(today):
-                logger.debug(f"Not time to send to {user.name} yet.")
-                continue
-
-            # Check if it's the right hour in the user's timezone
+        today_ord = today.toordinal()
+        # One clock read per tick; per-user local hours derive from it below.
+        utc_now = datetime.now(pytz.UTC)
+        to_send: list[tuple[User, str]] = []
+        # Per-tick counters; one summary line replaces per-user log calls
+        # (each of which costs an f-string format even when filtered out).
+        debug = logger.isEnabledFor(logging.DEBUG)
+        skipped_hour = 0
+        bad_tz = 0
+
+        # The due index already excludes inactive users and those not yet
+        # at their cadence, so the loop only touches due candidates.
+        for user in self.store.due_users(today):
+            # Check if it's the right hour in the user's timezone.
+            # astimezone on the aware utc_now skips pytz's localize path.
             try:
-                user_tz = pytz.timezone(user.timezone)
-                user_now = datetime.now(user_tz)
-                current_hour = user_now.hour
+                current_hour = utc_now.astimezone(_tz(user.timezone)).hour
 
                 if current_hour != user.preferred_hour:
-                    logger.debug(
-                        f"Not the right hour for {user.name} "
-                        f"(current: {current_hour}, preferred: {user.preferred_hour})"
-                    )
+                    skipped_hour += 1
+                    if debug:
+                        logger.debug(
+                            f"Not the right hour for {user.name} "
+                            f"(current: {current_hour}, preferred: {user.preferred_hour})"
+                        )
                     continue
             except pytz.exceptions.UnknownTimeZoneError:
+                bad_tz += 1
                 logger.error(f"Unknown timezone for {user.name}: {user.timezone}")
                 continue
 
-            # Send the reminder
-            logger.info(f"Sending reminder to {user.name} ({user.phone})")
-            success = self.sender.send_exercise_reminder(user)
+            # Due now: render the body up front, send in the fan-out below
+            to_send.append((user, self.sender.build_exercise_reminder(user, today_ord)))
 
-            if success:
-                self.store.update_user(
-                    user.phone,
-                    last_sent_date=today.isoformat(),
+        # Fan the sends out over a bounded pool: each send is a blocking
+        # HTTPS round trip, so N due users sequentially costs N x RTT.
+        # The pool overlaps the waits while its size caps Twilio load.
+        sent_count = 0
+        if to_send:
+            with ThreadPoolExecutor(max_workers=MAX_SEND_WORKERS) as pool:
+                sids = list(
+                    pool.map(lambda p: self.sender.send_message(p[0].phone, p[1]), to_send)
                 )
-                sent_count += 1
 
-        logger.info(f"=== Reminder check complete. Sent {sent_count} messages. ===")
+            # One batched save instead of a full-file rewrite per user.
+            today_iso = today.isoformat()
+            for (user, _body), sid in zip(to_send, sids):
+                if sid is not None:
+                    user.last_sent_date = today_iso
+                    sent_count += 1
+            if sent_count:
+                self.store.save_users(users)
+
+        logger.info(
+            "=== Reminder check complete: sent=%d failed=%d "
+            "skipped_hour=%d bad_tz=%d ===",
+            sent_count, len(to_send) - sent_count, skipped_hour, bad_tz,
+        )
+        return True
+
+    def seconds_until_next_due(self) -> float:
+        """Seconds until the next active user's reminder slot arrives.
+
+        Lets the scheduler wake when a send can actually happen instead
+        of on a fixed cadence. With no active users (or all slots more
+        than an hour out) the caller's ceiling applies.
+        """
+        utc_now = datetime.now(pytz.UTC)
+        best: Optional[datetime] = None
+        for user in self.store.active_users():
+            try:
+                tz = _tz(user.timezone)
+            except pytz.exceptions.UnknownTimeZoneError:
+                continue
+            local_now = utc_now.astimezone(tz)
+            due_ord = user.next_due_ordinal()
+            due_date = date.fromordinal(due_ord) if due_ord else local_now.date()
+            if due_date < local_now.date():
+                due_date = local_now.date()
+            slot = tz.localize(datetime.combine(due_date, dt_time(user.preferred_hour)))
+            if slot <= local_now:
+                # Today's slot has passed; the next chance is tomorrow.
+                slot = tz.localize(
+                    datetime.combine(due_date + timedelta(days=1), dt_time(user.preferred_hour))
+                )
+            if best is None or slot < best:
+                best = slot
+        if best is None:
+            return 3600.0
+        return (best - utc_now).total_seconds()
 
     def handle_reply(self, from_number: str, body: str) -> Optional[str]:
         """
@@ -177,30 +319,33 @@ class ReminderScheduler:
             logger.warning(f"Received reply from unknown number: {from_number}")
             return None
 
-        body_lower = body.strip().lower()
         now_str = datetime.now(timezone.utc).isoformat()
 
-        # Update last reply info regardless of content
-        self.store.update_user(
-            from_number,
-            last_reply=body.strip(),
-            last_reply_date=now_str,
-        )
+        # Record the reply and any opt-in/out toggle in one update_user
+        # call: each call rewrites the whole users file, so folding the
+        # active flag in halves the writes for opt messages.
+        updates = {
+            "last_reply": body.strip(),
+            "last_reply_date": now_str,
+        }
 
-        # Handle opt-out
-        if body_lower in ("no", "stop", "unsubscribe", "quit", "cancel"):
-            self.store.update_user(from_number, active=False)
+        match = _INTENT_RE.match(body)
+        intent = _INTENT[match.group("word").lower()] if match else None
+
+        if intent == "opt_out":
+            self.store.update_user(from_number, active=False, **updates)
             logger.info(f"User {user.name} ({from_number}) opted out.")
             return get_opt_out_confirmation(user.name)
 
-        # Handle opt-in
-        if body_lower in ("start", "yes", "resume", "subscribe"):
-            self.store.update_user(from_number, active=True)
+        if intent == "opt_in":
+            self.store.update_user(from_number, active=True, **updates)
             logger.info(f"User {user.name} ({from_number}) opted back in.")
             return get_opt_in_confirmation(user.name)
 
-        # Handle OK confirmation
-        if body_lower in ("ok", "done", "完成", "做了", "好"):
+        # Update last reply info for all other content
+        self.store.update_user(from_number, **updates)
+
+        if intent == "ok":
             logger.info(f"User {user.name} ({from_number}) confirmed exercise completion.")
             return get_ok_acknowledgment(user.name)
 
@@ -212,7 +357,10 @@ class ReminderScheduler:
                 # Map phone to member_id (default to phone-based lookup)
                 member_id = getattr(user, 'member_id', user.name.lower().replace(' ', '_'))
                 response = log_health_data(member_id, from_number, health_data)
-                logger.info(f"Health data recorded for {user.name}: {health_data}")
+                # log_health_data now owns (and annotates) the parsed dict;
+                # log the reading type rather than the whole record.
+                logger.info("Health data recorded for %s: type=%s",
+                            user.name, health_data.get("type"))
                 return response
         except ImportError:
             pass
@@ -6,7 +6,6 @@ Run with: python -m pytest tests/ -v
 import json
 import os
 import sys
-import tempfile
 from datetime import date, timedelta
 
 import pytest
@@ -74,58 +73,40 @@ class TestUser:
 class TestUserStore:
     """Tests for the UserStore."""
 
-    def test_save_and_load(self):
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            filepath = f.name
-
-        try:
-            store = UserStore(filepath=filepath)
-            users = [
-                User(name="Alice", phone="+1111", timezone="UTC", age=63),
-                User(name="Bob", phone="+2222", timezone="UTC", age=40),
-            ]
-            store.save_users(users)
-            loaded = store.load_users()
-            assert len(loaded) == 2
-            assert loaded[0].name == "Alice"
-            assert loaded[1].name == "Bob"
-        finally:
-            os.unlink(filepath)
-
-    def test_get_user_by_phone(self):
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            filepath = f.name
-
-        try:
-            store = UserStore(filepath=filepath)
-            users = [
-                User(name="Alice", phone="+1111", timezone="UTC", age=63),
-            ]
-            store.save_users(users)
-            user = store.get_user_by_phone("+1111")
-            assert user is not None
-            assert user.name == "Alice"
-
-            user = store.get_user_by_phone("+9999")
-            assert user is None
-        finally:
-            os.unlink(filepath)
-
-    def test_update_user(self):
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            filepath = f.name
-
-        try:
-            store = UserStore(filepath=filepath)
-            users = [
-                User(name="Alice", phone="+1111", timezone="UTC", age=63, active=True),
-            ]
-            store.save_users(users)
-            store.update_user("+1111", active=False)
-            user = store.get_user_by_phone("+1111")
-            assert user.active is False
-        finally:
-            os.unlink(filepath)
+    def test_save_and_load(self, tmp_path):
+        store = UserStore(filepath=str(tmp_path / "users.json"))
+        users = [
+            User(name="Alice", phone="+1111", timezone="UTC", age=63),
+            User(name="Bob", phone="+2222", timezone="UTC", age=40),
+        ]
+        store.save_users(users)
+        loaded = store.load_users()
+        assert len(loaded) == 2
+        assert loaded[0].name == "Alice"
+        assert loaded[1].name == "Bob"
+
+    def test_get_user_by_phone(self, tmp_path):
+        store = UserStore(filepath=str(tmp_path / "users.json"))
+        users = [
+            User(name="Alice", phone="+1111", timezone="UTC", age=63),
+        ]
+        store.save_users(users)
+        user = store.get_user_by_phone("+1111")
+        assert user is not None
+        assert user.name == "Alice"
+
+        user = store.get_user_by_phone("+9999")
+        assert user is None
+
+    def test_update_user(self, tmp_path):
+        store = UserStore(filepath=str(tmp_path / "users.json"))
+        users = [
+            User(name="Alice", phone="+1111", timezone="UTC", age=63, active=True),
+        ]
+        store.save_users(users)
+        store.update_user("+1111", active=False)
+        user = store.get_user_by_phone("+1111")
+        assert user.active is False
 
 
 class TestMessages:
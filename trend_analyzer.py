@@ -15,14 +15,53 @@ Integrates with health_tracker.py for data and medication_manager.py for context
 
 import json
 import logging
-import statistics
+import math
+import time
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=None)
+def _ensure_data_dir(data_dir: str) -> Path:
+    """Create the data directory once per path per process.
+
+    Analyzers are often constructed per request; the memoization keeps
+    repeated instantiations from re-running the stat+mkdir syscalls.
+    """
+    path = Path(data_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@lru_cache(maxsize=32)
+def _inv_height_sq(height_cm: float) -> float:
+    """1/height² in metres, cached per height so BMI is one multiply.
+
+    Heights are per-member constants, so every analysis and risk score
+    for the same member hits the cache.
+    """
+    return (100.0 / height_cm) ** 2
+
+
+def _sample_std(values: list, mean: float) -> float:
+    """Sample standard deviation from a precomputed mean (0.0 for n < 2).
+
+    One C-level sum of squares plus the E[X²]−E[X]² identity; fine for
+    reading-scale magnitudes and much cheaper than statistics.stdev,
+    which re-derives the mean through exact-ratio arithmetic.
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    var = (sum(v * v for v in values) - n * mean * mean) / (n - 1)
+    return math.sqrt(var) if var > 0 else 0.0
+
 # Blood pressure classification (AHA guidelines)
 BP_CATEGORIES = [
     {"name": "Normal", "systolic_max": 120, "diastolic_max": 80, "risk": "low"},
@@ -42,13 +81,91 @@ BMI_CATEGORIES = [
     {"name": "Obese Class III", "max": 999, "risk": "critical"},
 ]
 
+# Sorted upper bounds extracted from the tables above (open-ended last
+# entries excluded), so classification is one bisect per axis instead of
+# a linear scan over list-of-dicts. The category dicts themselves are
+# returned as-is — nothing is rebuilt per call.
+_BP_SYS_MAX = tuple(c["systolic_max"] for c in BP_CATEGORIES[:-1])
+_BP_DIA_MAX = tuple(c["diastolic_max"] for c in BP_CATEGORIES[:-1])
+_BMI_MAX = tuple(c["max"] for c in BMI_CATEGORIES[:-1])
+
+# Risk-score ladders as lookup tables, built once at import. Age maps
+# through bisect over its bracket bounds; BP/BMI map by risk label.
+_AGE_BOUNDS = (45, 55, 65)
+_AGE_SCORES = (5, 10, 15, 20)
+_BP_RISK_SCORES = {"low": 0, "moderate": 10, "high": 15, "very_high": 20, "critical": 25}
+_BMI_RISK_SCORES = {"low": 5, "moderate": 8, "high": 12, "very_high": 14, "critical": 15}
+
+# Recommendation text tables, built once at import
+_BP_RECS = {
+    "Normal": "Maintain healthy lifestyle. Continue monitoring.",
+    "Elevated": "Reduce sodium intake, increase exercise. Monitor weekly.",
+    "Stage 1 Hypertension": "Consult physician. Lifestyle changes recommended. Monitor daily.",
+    "Stage 2 Hypertension": "See physician promptly. Medication may be needed.",
+    "Hypertensive Crisis": "SEEK IMMEDIATE MEDICAL ATTENTION.",
+}
+
+_RISK_RECS = {
+    "Low": "Continue healthy habits. Annual checkup recommended.",
+    "Moderate": "Focus on diet and exercise. Semi-annual checkups recommended.",
+    "High": "Consult physician for comprehensive evaluation. Quarterly monitoring.",
+    "Very High": "Urgent medical consultation recommended. Monthly monitoring.",
+}
+
+
+@lru_cache(maxsize=32)
+def _bp_recommendation(category_name: str, trend: str) -> str:
+    """BP recommendation text; pure in its inputs, so memoized."""
+    rec = _BP_RECS.get(category_name, "Consult physician.")
+    if trend == "increasing":
+        rec += " NOTE: BP trend is increasing — discuss with doctor."
+    return rec
+
+
+@lru_cache(maxsize=8)
+def _risk_recommendation(level: str) -> str:
+    """Risk-level recommendation text; memoized like the BP variant."""
+    return _RISK_RECS.get(level, "Consult physician.")
+
+
+# strftime goes through locale-aware C machinery on every call; the
+# header date only changes once a day, so cache it keyed on the UTC day.
+_date_cache: tuple[int, str] = (0, "")
+
+
+def _today_str() -> str:
+    """Today's UTC date as '%b %d, %Y', recomputed once per day."""
+    global _date_cache
+    day = int(time.time() // 86400)
+    if day != _date_cache[0]:
+        _date_cache = (day, datetime.now(timezone.utc).strftime("%b %d, %Y"))
+    return _date_cache[1]
+
+
+# Weekly-summary section templates, pre-joined once at import so each
+# summary is one format call per section plus a single join, instead of
+# a dozen f-string appends (mirrors messages._ROUTINE_TEMPLATES).
+_WEEKLY_HEADER_TMPL = "Weekly Health Summary\n{member_id} | {date}\n" + "─" * 30
+_WEEKLY_BP_TMPL = (
+    "\nBlood Pressure:"
+    "\n  Latest: {systolic}/{diastolic} ({category})"
+    "\n  Avg: {systolic_avg}/{diastolic_avg}"
+    "\n  Trend: {trend}"
+)
+_WEEKLY_WT_TMPL = (
+    "\nWeight:"
+    "\n  Latest: {weight_kg}kg (BMI {bmi})"
+    "\n  Trend: {trend} ({weekly_change:+.1f} kg/week)"
+)
+_WEEKLY_ADH_TMPL = "\nMedication Adherence: {rate}%\n  Status: {status}"
+_WEEKLY_FOOTER = "\nReply HEALTH for detailed report"
+
 
 class TrendAnalyzer:
     """Analyze health metrics trends for family members."""
 
     def __init__(self, data_dir: str = "data/trends"):
-        self.data_dir = Path(data_dir)
-        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.data_dir = _ensure_data_dir(data_dir)
 
     def analyze_blood_pressure(
         self,
@@ -64,41 +181,53 @@ class TrendAnalyzer:
         if not readings:
             return {"status": "no_data", "message": "No blood pressure readings available"}
 
+        n = len(readings)
         systolic_values = [r["systolic"] for r in readings]
         diastolic_values = [r["diastolic"] for r in readings]
 
         latest = readings[-1]
         category = self._classify_bp(latest["systolic"], latest["diastolic"])
 
+        # All aggregates come from the C-level builtins over the value
+        # lists extracted once above; statistics.mean/stdev re-walk the
+        # data through exact-ratio arithmetic on every call.
+        mean_sys = sum(systolic_values) / n
+
         # Trend analysis
         trend = "stable"
-        if len(systolic_values) >= 5:
-            recent_avg = statistics.mean(systolic_values[-5:])
-            older_avg = statistics.mean(systolic_values[:5]) if len(systolic_values) >= 10 else statistics.mean(systolic_values[:len(systolic_values) // 2])
+        if n >= 5:
+            recent_avg = sum(systolic_values[-5:]) / 5
+            if n >= 10:
+                older_avg = sum(systolic_values[:5]) / 5
+            else:
+                half = n // 2
+                older_avg = sum(systolic_values[:half]) / half
             diff = recent_avg - older_avg
             if diff > 5:
                 trend = "increasing"
             elif diff < -5:
                 trend = "decreasing"
 
-        # Anomaly detection
+        # Anomaly detection: mean and deviation threshold computed once,
+        # so the loop is a single compare per reading.
         anomalies = []
-        if len(systolic_values) >= 5:
-            mean_sys = statistics.mean(systolic_values)
-            std_sys = statistics.stdev(systolic_values) if len(systolic_values) > 1 else 0
-            for i, r in enumerate(readings):
-                if std_sys > 0 and abs(r["systolic"] - mean_sys) > 2 * std_sys:
-                    anomalies.append({
-                        "index": i,
-                        "systolic": r["systolic"],
-                        "diastolic": r["diastolic"],
-                        "timestamp": r.get("timestamp", ""),
-                        "type": "high" if r["systolic"] > mean_sys else "low",
-                    })
+        if n >= 5:
+            std_sys = _sample_std(systolic_values, mean_sys)
+            if std_sys > 0:
+                threshold = 2 * std_sys
+                for i, r in enumerate(readings):
+                    if abs(r["systolic"] - mean_sys) > threshold:
+                        anomalies.append({
+                            "index": i,
+                            "systolic": r["systolic"],
+                            "diastolic": r["diastolic"],
+                            "timestamp": r.get("timestamp", ""),
+                            "type": "high" if r["systolic"] > mean_sys else "low",
+                        })
 
         return {
             "member_id": member_id,
-            "total_readings": len(readings),
+            "total_readings": n,
             "latest": {
                 "systolic": latest["systolic"],
                 "diastolic": latest["diastolic"],
@@ -106,10 +235,10 @@ class TrendAnalyzer:
                 "risk": category["risk"],
             },
             "statistics": {
-                "systolic_avg": round(statistics.mean(systolic_values), 1),
+                "systolic_avg": round(mean_sys, 1),
                 "systolic_min": min(systolic_values),
                 "systolic_max": max(systolic_values),
-                "diastolic_avg": round(statistics.mean(diastolic_values), 1),
+                "diastolic_avg": round(sum(diastolic_values) / n, 1),
                 "diastolic_min": min(diastolic_values),
                 "diastolic_max": max(diastolic_values),
             },
@@ -136,18 +265,20 @@ class TrendAnalyzer:
         if not readings:
             return {"status": "no_data"}
 
+        n = len(readings)
         weights = [r["weight_kg"] for r in readings]
         latest = weights[-1]
-        bmi = latest / ((height_cm / 100) ** 2)
+        mean_wt = sum(weights) / n
+        bmi = latest * _inv_height_sq(height_cm)
         bmi_category = self._classify_bmi(bmi)
 
         # Weight trend
         trend = "stable"
         weekly_change = 0
-        if len(weights) >= 7:
-            recent = statistics.mean(weights[-7:])
-            older = statistics.mean(weights[:7]) if len(weights) >= 14 else weights[0]
-            weeks = max(1, len(weights) / 7)
+        if n >= 7:
+            recent = sum(weights[-7:]) / 7
+            older = sum(weights[:7]) / 7 if n >= 14 else weights[0]
+            weeks = max(1, n / 7)
             weekly_change = (recent - older) / weeks
             if weekly_change > 0.2:
                 trend = "gaining"
@@ -181,7 +312,7 @@ class TrendAnalyzer:
 
         return {
             "member_id": member_id,
-            "total_readings": len(readings),
+            "total_readings": n,
             "latest": {
                 "weight_kg": latest,
                 "bmi": round(bmi, 1),
@@ -189,10 +320,10 @@ class TrendAnalyzer:
                 "risk": bmi_category["risk"],
             },
             "statistics": {
-                "avg_kg": round(statistics.mean(weights), 1),
+                "avg_kg": round(mean_wt, 1),
                 "min_kg": round(min(weights), 1),
                 "max_kg": round(max(weights), 1),
-                "std_kg": round(statistics.stdev(weights), 2) if len(weights) > 1 else 0,
+                "std_kg": round(_sample_std(weights, mean_wt), 2),
             },
             "trend": trend,
             "weekly_change_kg": round(weekly_change, 2),
@@ -207,35 +338,40 @@ class TrendAnalyzer:
         adherence_data: dict = None,
     ) -> str:
         """Generate a weekly health summary for SMS delivery."""
-        now = datetime.now(timezone.utc)
-        lines = [
-            f"Weekly Health Summary",
-            f"{member_id} | {now.strftime('%b %d, %Y')}",
-            "─" * 30,
+        sections = [
+            _WEEKLY_HEADER_TMPL.format(member_id=member_id, date=_today_str()),
         ]
 
         if bp_readings:
             bp = self.analyze_blood_pressure(bp_readings[-7:], member_id)
-            lines.append(f"\nBlood Pressure:")
-            lines.append(f"  Latest: {bp['latest']['systolic']}/{bp['latest']['diastolic']} ({bp['latest']['category']})")
-            lines.append(f"  Avg: {bp['statistics']['systolic_avg']}/{bp['statistics']['diastolic_avg']}")
-            lines.append(f"  Trend: {bp['trend']}")
+            sections.append(_WEEKLY_BP_TMPL.format(
+                systolic=bp["latest"]["systolic"],
+                diastolic=bp["latest"]["diastolic"],
+                category=bp["latest"]["category"],
+                systolic_avg=bp["statistics"]["systolic_avg"],
+                diastolic_avg=bp["statistics"]["diastolic_avg"],
+                trend=bp["trend"],
+            ))
 
         if weight_readings:
             wt = self.analyze_weight(weight_readings[-7:], member_id=member_id)
-            lines.append(f"\nWeight:")
-            lines.append(f"  Latest: {wt['latest']['weight_kg']}kg (BMI {wt['latest']['bmi']})")
-            lines.append(f"  Trend: {wt['trend']} ({wt['weekly_change_kg']:+.1f} kg/week)")
+            sections.append(_WEEKLY_WT_TMPL.format(
+                weight_kg=wt["latest"]["weight_kg"],
+                bmi=wt["latest"]["bmi"],
+                trend=wt["trend"],
+                weekly_change=wt["weekly_change_kg"],
+            ))
 
         if adherence_data:
             rate = adherence_data.get("overall_adherence_rate", 0)
-            lines.append(f"\nMedication Adherence: {rate}%")
-            status = "Great!" if rate >= 80 else "Needs improvement"
-            lines.append(f"  Status: {status}")
+            sections.append(_WEEKLY_ADH_TMPL.format(
+                rate=rate,
+                status="Great!" if rate >= 80 else "Needs improvement",
+            ))
 
-        lines.append("\nReply HEALTH for detailed report")
+        sections.append(_WEEKLY_FOOTER)
 
-        return "\n".join(lines)
+        return "\n".join(sections)
 
     def calculate_health_risk_score(
         self,
@@ -256,35 +392,24 @@ class TrendAnalyzer:
         factors = []
 
         # Age factor (0-20 points)
-        if age >= 65:
-            score += 20
-            factors.append(f"Age {age}: +20")
-        elif age >= 55:
-            score += 15
-            factors.append(f"Age {age}: +15")
-        elif age >= 45:
-            score += 10
-            factors.append(f"Age {age}: +10")
-        else:
-            score += 5
-            factors.append(f"Age {age}: +5")
+        age_score = _AGE_SCORES[bisect_right(_AGE_BOUNDS, age)]
+        score += age_score
+        factors.append(f"Age {age}: +{age_score}")
 
         # Blood pressure (0-25 points)
         if bp_readings:
             latest_bp = bp_readings[-1]
             cat = self._classify_bp(latest_bp["systolic"], latest_bp["diastolic"])
-            bp_scores = {"low": 0, "moderate": 10, "high": 15, "very_high": 20, "critical": 25}
-            bp_score = bp_scores.get(cat["risk"], 10)
+            bp_score = _BP_RISK_SCORES.get(cat["risk"], 10)
             score += bp_score
             factors.append(f"BP {latest_bp['systolic']}/{latest_bp['diastolic']} ({cat['name']}): +{bp_score}")
 
         # BMI (0-15 points)
         if weight_readings:
             latest_wt = weight_readings[-1]["weight_kg"]
-            bmi = latest_wt / ((height_cm / 100) ** 2)
+            bmi = latest_wt * _inv_height_sq(height_cm)
             bmi_cat = self._classify_bmi(bmi)
-            bmi_scores = {"low": 5, "moderate": 8, "high": 12, "very_high": 14, "critical": 15}
-            bmi_score = bmi_scores.get(bmi_cat["risk"], 5)
+            bmi_score = _BMI_RISK_SCORES.get(bmi_cat["risk"], 5)
             # Normal BMI gets 0
             if bmi_cat["name"] == "Normal":
                 bmi_score = 0
@@ -327,42 +452,26 @@ class TrendAnalyzer:
         }
 
     def _classify_bp(self, systolic: int, diastolic: int) -> dict:
-        """Classify blood pressure reading."""
-        for cat in BP_CATEGORIES:
-            if systolic <= cat["systolic_max"] and diastolic <= cat["diastolic_max"]:
-                return cat
-        return BP_CATEGORIES[-1]
+        """Classify blood pressure reading.
+
+        A reading lands in the first category both its values fit; with
+        the bound tuples nondecreasing that's the worse of the two
+        per-axis bisect positions.
+        """
+        i = max(bisect_left(_BP_SYS_MAX, systolic), bisect_left(_BP_DIA_MAX, diastolic))
+        return BP_CATEGORIES[i]
 
     def _classify_bmi(self, bmi: float) -> dict:
         """Classify BMI."""
-        for cat in BMI_CATEGORIES:
-            if bmi <= cat["max"]:
-                return cat
-        return BMI_CATEGORIES[-1]
+        return BMI_CATEGORIES[bisect_left(_BMI_MAX, bmi)]
 
     def _bp_recommendation(self, category: dict, trend: str) -> str:
         """Generate BP recommendation."""
-        recs = {
-            "Normal": "Maintain healthy lifestyle. Continue monitoring.",
-            "Elevated": "Reduce sodium intake, increase exercise. Monitor weekly.",
-            "Stage 1 Hypertension": "Consult physician. Lifestyle changes recommended. Monitor daily.",
-            "Stage 2 Hypertension": "See physician promptly. Medication may be needed.",
-            "Hypertensive Crisis": "SEEK IMMEDIATE MEDICAL ATTENTION.",
-        }
-        rec = recs.get(category["name"], "Consult physician.")
-        if trend == "increasing":
-            rec += " NOTE: BP trend is increasing — discuss with doctor."
-        return rec
+        return _bp_recommendation(category["name"], trend)
 
     def _risk_recommendation(self, level: str) -> str:
         """Generate risk-based recommendation."""
-        recs = {
-            "Low": "Continue healthy habits. Annual checkup recommended.",
-            "Moderate": "Focus on diet and exercise. Semi-annual checkups recommended.",
-            "High": "Consult physician for comprehensive evaluation. Quarterly monitoring.",
-            "Very High": "Urgent medical consultation recommended. Monthly monitoring.",
-        }
-        return recs.get(level, "Consult physician.")
+        return _risk_recommendation(level)
 
 
 if __name__ == "__main__":